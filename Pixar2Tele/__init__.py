@@ -3,3 +3,4 @@ from .utils import P2TLogging, autoRetry, logIfError
 _ = P2TLogging()
 
 from .tasks import Tasks
+from .scheduler import ScheduledBot, TelegramScheduler
@@ -0,0 +1,107 @@
+'''
+封面渲染：以尽量低的分辨率解码原图（JPEG 的 draft 模式、`Image.reduce`），缩放到 Telegram 照片的尺寸限制内，
+再搜索 JPEG 画质，保证输出不超过文件大小限制。动图（GIF、WebP、APNG、MP4）只取第一帧。
+'''
+
+import io
+import os
+
+from PIL import Image, ImageFile
+
+from .ugoira import readVideoFirstFrame
+
+
+
+# 允许打开损坏的图像
+ImageFile.LOAD_TRUNCATED_IMAGES = True
+
+
+
+def loadCoverFrame(input_path: str, max_dim: int) -> Image.Image:
+    '''
+    解码原图（动图取第一帧），返回最长边不超过`max_dim`的 RGB 图像。
+    JPEG 在解码时直接按 1/2、1/4、1/8 缩小，其他格式解码后先用`reduce`整数倍缩小，再精确缩放。
+    '''
+    if os.path.splitext(input_path)[1].lower() == '.mp4': image = readVideoFirstFrame(input_path)
+    else:
+        image = Image.open(input_path)
+        # 动图停在第一帧，不需要先把整帧写到磁盘
+        if getattr(image, 'is_animated', False): image.seek(0)
+        # draft 只对 JPEG 生效，按不小于目标尺寸的最小缩放比例解码
+        image.draft('RGB', (max_dim, max_dim))
+        image.load()
+
+    # `reduce`不支持调色板（P）、黑白（1）、16 位灰度（I;16）等模式，缩小前先统一模式
+    image = normalizeMode(image)
+    factor = max(image.size) // max_dim
+    if factor >= 2: image = image.reduce(factor)
+    if max(image.size) > max_dim: image.thumbnail((max_dim, max_dim), Image.LANCZOS)
+
+    # 透明背景铺白底，其他模式直接转为 RGB
+    if image.mode == 'RGBA':
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    return image.convert('RGB')
+
+
+def normalizeMode(image: Image.Image) -> Image.Image:
+    '''
+    把图像转为`reduce`和`thumbnail`都支持的模式：带透明度的转为 RGBA，16 位灰度缩放为 8 位灰度（L），
+    RGB 和 L 保持不变，其他模式转为 RGB。
+    '''
+    if image.mode in ('RGB', 'L', 'RGBA'): return image
+    if image.mode in ('LA', 'PA') or (image.mode == 'P' and 'transparency' in image.info):
+        return image.convert('RGBA')
+    # 直接转换会把大于 255 的值截断为白色
+    if image.mode.startswith('I'): return image.convert('I').point(lambda value: value / 256, 'L')
+    return image.convert('RGB')
+
+
+def encodeJpegWithin(
+        image: Image.Image,
+        max_file_size: int,
+        min_quality: int = 40,
+        max_quality: int = 95,
+        scale_step: float = 0.75,
+    ) -> bytes:
+    '''
+    二分搜索不超过`max_file_size`的最高 JPEG 画质；最低画质仍然超出时，缩小图像再搜索。
+
+    :return: JPEG 文件内容，保证不超过`max_file_size`字节。
+    '''
+    def encode(img: Image.Image, quality: int) -> bytes:
+        buffer = io.BytesIO()
+        img.save(buffer, format='JPEG', quality=quality, optimize=True, progressive=True)
+        return buffer.getvalue()
+
+    while True:
+        data = encode(image, max_quality)
+        if len(data) <= max_file_size: return data
+        best = None
+        low, high = min_quality, max_quality - 1
+        while low <= high:
+            quality = (low + high) // 2
+            data = encode(image, quality)
+            if len(data) <= max_file_size:
+                best = data
+                low = quality + 1
+            else: high = quality - 1
+        if best is not None: return best
+        new_size = (max(int(image.width * scale_step), 1), max(int(image.height * scale_step), 1))
+        if new_size == image.size: raise ValueError(f"无法把封面压缩到 {max_file_size} 字节以内。")
+        image = image.resize(new_size, Image.LANCZOS)
+
+
+def renderCover(input_path: str, output_path: str, max_dim: int, max_file_size: int) -> str:
+    '''
+    把原图渲染为符合 Telegram 照片限制的 JPEG 封面，先写入临时文件再原子重命名。
+
+    :return: `output_path`
+    '''
+    image = loadCoverFrame(input_path, max_dim)
+    data = encodeJpegWithin(image, max_file_size)
+    temp_path = f'{output_path}.part'
+    with open(temp_path, 'wb') as f: f.write(data)
+    os.replace(temp_path, output_path)
+    return output_path
@@ -0,0 +1,148 @@
+'''
+作品存活检查：按作品的稳定程度分层安排复查周期，每次同步只并发检查有限数量的到期作品。
+'''
+
+import logging
+
+from collections import defaultdict
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+
+from .pixiv import PixivTools
+
+
+
+class ExistenceChecker:
+    '''
+    存活检查的层级：作品距上次变化（存活状态改变，或作品本身的修改时间）越久，复查间隔越长。
+
+    - 元数据中记录的字段：
+    ```
+    {
+        "existenceCheckedAt": <上次检查存活状态的时间: str (ISO 8601)>,
+        "existenceChangedAt": <上次存活状态改变的时间: str (ISO 8601)>,
+    }
+    ```
+    '''
+    # (稳定时长上限, 复查间隔)，按顺序匹配第一个满足的层级
+    DEFAULT_TIERS = [
+        (timedelta(days=30), timedelta(days=1)),
+        (timedelta(days=365), timedelta(days=7)),
+        (timedelta.max, timedelta(days=30)),
+    ]
+
+    def __init__(
+            self,
+            pixiv: PixivTools,
+            max_workers: int = 4,
+            max_checks_per_run: int = 500,
+            tiers: list[tuple[timedelta, timedelta]] = None,
+            batch_size: int = 48,
+        ):
+        self.Pixiv = pixiv
+        self.MAX_WORKERS = max_workers
+        self.MAX_CHECKS_PER_RUN = max_checks_per_run
+        self.BATCH_SIZE = batch_size
+        self.TIERS = tiers if tiers is not None else self.DEFAULT_TIERS
+
+        # 日志
+        self.logger = logging.getLogger('Pixar2Tele')
+
+
+    def getRecheckInterval(self, artwork_info: dict, now: datetime) -> timedelta:
+        '''根据作品稳定的时长，确定复查间隔。'''
+        stable_since = artwork_info.get('existenceChangedAt') or artwork_info.get('updateDate')
+        try: stable_for = now - datetime.fromisoformat(stable_since)
+        except (TypeError, ValueError): stable_for = timedelta(0)
+        for max_stable_for, interval in self.TIERS:
+            if stable_for < max_stable_for: return interval
+        return self.TIERS[-1][1]
+
+
+    def selectDueIds(self, illust_ids: list[str], meta_dict: dict[str, dict], now: datetime) -> list[str]:
+        '''
+        挑选本次需要检查的作品：从未检查过的优先，其次按超期程度（超期时长 / 复查间隔）从大到小，
+        最多`self.MAX_CHECKS_PER_RUN`个。
+        '''
+        priorities = []
+        for illust_id in illust_ids:
+            artwork_info = meta_dict.get(str(illust_id), dict())
+            checked_at = artwork_info.get('existenceCheckedAt')
+            if not checked_at:
+                priorities.append((float('inf'), illust_id))
+                continue
+            interval = self.getRecheckInterval(artwork_info, now)
+            overdue = now - datetime.fromisoformat(checked_at) - interval
+            if overdue >= timedelta(0):
+                priorities.append((overdue / interval, illust_id))
+        priorities.sort(key=lambda item: item[0], reverse=True)
+        return [illust_id for _, illust_id in priorities[:self.MAX_CHECKS_PER_RUN]]
+
+
+    def probe(
+            self,
+            illust_ids: list[str],
+            meta_dict: dict[str, dict] = None,
+        ) -> dict[str, bool]:
+        '''
+        并发检查作品是否存活。检查失败的作品不会出现在结果中，留到下次再查。
+
+        如果给出`meta_dict`，先按元数据中的`authorUserId`把作品分组，每个作者一次批量查询多个作品；
+        只有批量查询无法判断的作品（作者ID未知，或作者接口报错）才逐个检查。
+
+        :return: `{作品ID: 是否存活}`
+        :rtype: `dict[str, bool]`
+        '''
+        def probeOne(illust_id):
+            try: return {illust_id: self.Pixiv.exists(illust_id)}
+            except Exception as e:
+                self.logger.warning(f"[存活检查] 作品 {illust_id} 检查失败：{e}")
+                return dict()
+
+        def probeBatch(author_user_id, batch_ids):
+            try: return self.Pixiv.existsByAuthor(author_user_id, batch_ids)
+            except Exception as e:
+                self.logger.info(f"[存活检查] 作者 {author_user_id} 的作品无法批量检查，改为逐个检查：{e}")
+                return None
+
+        if not illust_ids: return dict()
+
+        # 按作者分组，作者ID未知或为 0（作品收藏时已 404）的作品只能逐个检查
+        single_ids, batches = [], []
+        author_groups = defaultdict(list)
+        for illust_id in illust_ids:
+            author_user_id = (meta_dict or dict()).get(str(illust_id), dict()).get('authorUserId')
+            if meta_dict is not None and str(author_user_id).isdigit() and int(author_user_id) > 0:
+                author_groups[str(author_user_id)].append(illust_id)
+            else: single_ids.append(illust_id)
+        for author_user_id, group_ids in author_groups.items():
+            # 只有一个作品的作者，批量查询也要一次请求，直接逐个检查
+            if len(group_ids) == 1:
+                single_ids += group_ids
+                continue
+            for start in range(0, len(group_ids), self.BATCH_SIZE):
+                batches.append((author_user_id, group_ids[start:start+self.BATCH_SIZE]))
+
+        existence_dict = dict()
+        with ThreadPoolExecutor(max_workers=self.MAX_WORKERS) as executor:
+            batch_futures = [(batch_ids, executor.submit(probeBatch, author_user_id, batch_ids))
+                for author_user_id, batch_ids in batches]
+            single_futures = [executor.submit(probeOne, illust_id) for illust_id in single_ids]
+            # 批量查询失败的作品，退回逐个检查
+            for batch_ids, future in batch_futures:
+                result = future.result()
+                if result is None:
+                    single_futures += [executor.submit(probeOne, illust_id) for illust_id in batch_ids]
+                else: existence_dict.update(result)
+            for future in single_futures: existence_dict.update(future.result())
+
+        self.logger.info(f"[存活检查] 检查 {len(illust_ids)} 个作品，" +\
+            f"批量请求 {len(batches)} 次，逐个检查 {len(single_futures)} 次。")
+        return existence_dict
+
+
+    def recordCheck(self, artwork_info: dict, changed: bool, now: datetime):
+        '''在元数据中记录本次检查的时间，存活状态改变时同时记录改变时间。'''
+        timestamp = now.isoformat(timespec='seconds')
+        artwork_info['existenceCheckedAt'] = timestamp
+        if changed: artwork_info['existenceChangedAt'] = timestamp
@@ -0,0 +1,50 @@
+'''
+Telegram file_id 缓存：按文件内容的 SHA-256 记录上传后得到的 file_id，同样的内容再次发送时直接使用 file_id，
+不再上传文件。file_id 只对上传它的 Bot 有效。
+'''
+
+import threading
+
+from .utils import loadJsonFile, saveJsonFile
+
+
+
+class FileIdCache:
+    '''
+    - 缓存文件的格式：
+    ```
+    {
+        "photo": {"<sha256>": "<file_id>", ...},
+        "document": {"<sha256>": "<file_id>", ...}
+    }
+    ```
+    照片按原图内容记录（发送前可能被压缩），文件按上传的内容记录。
+    '''
+    KINDS = ('photo', 'document')
+
+    def __init__(self, cache_file_path: str = None):
+        self.CACHE_FILE_PATH = cache_file_path
+        cache = loadJsonFile(cache_file_path, dict()) if cache_file_path else dict()
+        self.cache = {kind: cache.get(kind, dict()) for kind in self.KINDS}
+        self.lock = threading.Lock()
+
+
+    def get(self, kind: str, sha256: str) -> str | None:
+        return self.cache[kind].get(sha256)
+
+
+    def put(self, kind: str, sha256: str, file_id: str):
+        with self.lock:
+            if self.cache[kind].get(sha256) == file_id: return
+            self.cache[kind][sha256] = file_id
+            self.save()
+
+
+    def discard(self, kind: str, sha256: str):
+        '''file_id 失效（例如 Bot 更换了 token）时移除。'''
+        with self.lock:
+            if self.cache[kind].pop(sha256, None) is not None: self.save()
+
+
+    def save(self):
+        if self.CACHE_FILE_PATH: saveJsonFile(self.CACHE_FILE_PATH, self.cache)
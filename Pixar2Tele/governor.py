@@ -0,0 +1,115 @@
+'''
+Pixiv 请求速率调节（AIMD）：响应正常时线性提高速率，遇到 429、403 或延迟突增时成倍降低速率。
+学到的速率保存在文件中，下次启动时从这个速率开始。
+'''
+
+import time
+import logging
+import threading
+
+from .utils import loadJsonFile, saveJsonFile
+
+
+
+class RateGovernor:
+    '''
+    所有 Pixiv 请求共用：每次请求前`acquire()`按当前速率排队，请求后用`onResponse()`/`onError()`反馈。
+
+    - 状态文件的格式：
+    ```
+    {
+        "rate": <上次运行结束时的速率（次/秒）: float>,
+        "latency": <正常响应延迟的滑动平均（秒）: float>,
+        "updatedAt": <保存时间戳: float>,
+    }
+    ```
+    '''
+    # 表示被限流的状态码
+    THROTTLE_STATUS_CODES = (403, 429)
+
+    def __init__(
+            self,
+            state_file_path: str = None,
+            initial_rate: float = 2,
+            min_rate: float = 0.2,
+            max_rate: float = 20,
+            additive_step: float = 0.1,
+            decrease_factor: float = 0.5,
+            spike_factor: float = 3,
+            min_spike_latency: float = 1,
+            save_interval: float = 60,
+        ):
+        '''
+        :param additive_step: 响应正常时每秒提高的速率（次/秒）。
+        :param decrease_factor: 被限流或延迟突增时速率乘以的系数。
+        :param spike_factor: 延迟超过滑动平均的多少倍视为突增（同时须超过`min_spike_latency`秒）。
+        '''
+        self.STATE_FILE_PATH = state_file_path
+        self.MIN_RATE = min_rate
+        self.MAX_RATE = max_rate
+        self.ADDITIVE_STEP = additive_step
+        self.DECREASE_FACTOR = decrease_factor
+        self.SPIKE_FACTOR = spike_factor
+        self.MIN_SPIKE_LATENCY = min_spike_latency
+        self.SAVE_INTERVAL = save_interval
+
+        state = loadJsonFile(state_file_path, dict()) if state_file_path else dict()
+        self.rate = min(max(state.get('rate', initial_rate), min_rate), max_rate)
+        self.latency = state.get('latency')
+        self.next_slot = time.monotonic()
+        self.decreased_at = 0
+        self.saved_at = time.monotonic()
+        self.lock = threading.Lock()
+
+        # 日志
+        self.logger = logging.getLogger('Pixar2Tele')
+
+
+    def acquire(self):
+        '''按当前速率给请求分配发送时间，等到该时间再返回。'''
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot)
+            self.next_slot = slot + 1 / self.rate
+        if slot > now: time.sleep(slot - now)
+
+
+    def onResponse(self, status_code: int, latency: float):
+        '''
+        :param latency: 从发出请求到收到响应头的秒数。
+        '''
+        if status_code in self.THROTTLE_STATUS_CODES:
+            self.decrease(f"状态码 {status_code}")
+        elif (self.latency is not None and latency > self.MIN_SPIKE_LATENCY
+        and latency > self.SPIKE_FACTOR * self.latency):
+            self.decrease(f"延迟 {latency:.2f}s，平均 {self.latency:.2f}s")
+        else:
+            with self.lock:
+                # 每个响应提高 step/rate，合计每秒提高约 step
+                self.rate = min(self.rate + self.ADDITIVE_STEP / self.rate, self.MAX_RATE)
+                self.latency = latency if self.latency is None else 0.8 * self.latency + 0.2 * latency
+        if time.monotonic() - self.saved_at > self.SAVE_INTERVAL: self.save()
+
+
+    def onError(self, e: Exception):
+        '''连接失败、超时等没有响应的情况。'''
+        self.decrease(type(e).__name__)
+
+
+    def decrease(self, reason: str):
+        with self.lock:
+            now = time.monotonic()
+            # 同一波限流只降一次：距上次降速不足两个请求间隔时忽略
+            if now - self.decreased_at < 2 / self.rate: return
+            self.decreased_at = now
+            self.rate = max(self.rate * self.DECREASE_FACTOR, self.MIN_RATE)
+            self.next_slot = max(self.next_slot, now + 1 / self.rate)
+        self.logger.info(f"[速率调节] {reason}，Pixiv 请求速率降为 {self.rate:.2f} 次/秒。")
+
+
+    def save(self):
+        if not self.STATE_FILE_PATH: return
+        with self.lock:
+            self.saved_at = time.monotonic()
+            state = {"rate": self.rate, "latency": self.latency, "updatedAt": time.time()}
+            saveJsonFile(self.STATE_FILE_PATH, state, indent=4)
@@ -0,0 +1,93 @@
+'''
+本地消息存储：记录 Bot 发送或修改过的每条消息（HTML 文本、聊天、消息ID、媒体），
+读取消息内容时直接查询，不必再把消息转发到垃圾桶聊天再删除。
+'''
+
+import json
+import time
+import sqlite3
+import threading
+
+from telebot.types import Message
+
+
+
+class MessageStore:
+    '''
+    - 表`messages`的列：
+    ```
+    chat_id: TEXT, message_id: INTEGER,     # 主键
+    html_text: TEXT,                        # 文本消息的 HTML 文本，或带图消息的 HTML 描述
+    media_type: TEXT,                       # telebot 的 content_type，如 text、photo、document
+    file_id: TEXT,                          # 媒体的 file_id（照片取最大尺寸）
+    raw_json: TEXT,                         # Bot API 返回的完整消息
+    updated_at: REAL
+    ```
+    '''
+    def __init__(self, db_file_path: str = ':memory:'):
+        self.DB_FILE_PATH = db_file_path
+        self.conn = sqlite3.connect(db_file_path, check_same_thread=False)
+        self.lock = threading.Lock()
+        with self.lock, self.conn:
+            self.conn.execute('PRAGMA journal_mode=WAL')
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS messages (
+                    chat_id TEXT NOT NULL,
+                    message_id INTEGER NOT NULL,
+                    html_text TEXT,
+                    media_type TEXT,
+                    file_id TEXT,
+                    raw_json TEXT NOT NULL,
+                    updated_at REAL NOT NULL,
+                    PRIMARY KEY (chat_id, message_id)
+                )
+            ''')
+
+
+    def record(self, message: Message):
+        '''记录或更新一条消息。'''
+        if message.text is not None: html_text = message.html_text
+        elif message.caption is not None: html_text = message.html_caption
+        else: html_text = None
+        media = getattr(message, message.content_type, None)
+        if isinstance(media, list): media = media[-1] if media else None
+        file_id = getattr(media, 'file_id', None)
+        with self.lock, self.conn:
+            self.conn.execute(
+                'INSERT OR REPLACE INTO messages VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (str(message.chat.id), message.message_id, html_text, message.content_type,
+                file_id, json.dumps(message.json, ensure_ascii=False), time.time()),
+            )
+
+
+    def delete(self, chat_id: int | str, message_id: int):
+        with self.lock, self.conn:
+            self.conn.execute('DELETE FROM messages WHERE chat_id = ? AND message_id = ?',
+                (str(chat_id), int(message_id)))
+
+
+    def get(self, chat_id: int | str, message_id: int) -> Message | None:
+        ''':return: 记录的消息，没有记录时返回`None`。'''
+        with self.lock:
+            row = self.conn.execute('SELECT raw_json FROM messages WHERE chat_id = ? AND message_id = ?',
+                (str(chat_id), int(message_id))).fetchone()
+        return Message.de_json(json.loads(row[0])) if row else None
+
+
+    def getHtmlText(self, chat_id: int | str, message_id: int) -> str | None:
+        with self.lock:
+            row = self.conn.execute('SELECT html_text FROM messages WHERE chat_id = ? AND message_id = ?',
+                (str(chat_id), int(message_id))).fetchone()
+        return row[0] if row else None
+
+
+    def observe(self, method: str, args: tuple, kwargs: dict, result):
+        '''作为`ScheduledBot`的观察者：记录发送、修改得到的消息，删除被删掉的消息。'''
+        if isinstance(result, Message): self.record(result)
+        elif isinstance(result, list):
+            for message in result:
+                if isinstance(message, Message): self.record(message)
+        elif method == 'delete_message' and result:
+            chat_id = kwargs.get('chat_id', args[0] if args else None)
+            message_id = kwargs.get('message_id', args[1] if len(args) > 1 else None)
+            if chat_id is not None and message_id is not None: self.delete(chat_id, message_id)
@@ -0,0 +1,204 @@
+'''
+元数据和同步记录的 SQLite 存储（WAL 模式）：按作品逐条写入，代替每次整体重写 metadata.json 和 records.csv。
+
+第一次打开空数据库时自动从原有的 metadata.json / records.csv 迁移（原文件保留不动）；
+需要 JSON / CSV 时可以导出：
+```
+python -m Pixar2Tele.metastore export ./metadata/metadata.sqlite3 ./metadata/metadata.json ./metadata/records.csv
+```
+'''
+
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+import pandas as pd
+
+from .utils import saveJsonFile
+
+
+
+RECORDS_COLUMNS = ['syncNo', 'id', 'existence', 'bookmarked']
+
+
+class MetaStore:
+    '''
+    - 表`artworks`：`id TEXT`（主键），`meta_json TEXT`（作品元数据），`updated_at REAL`
+    - 表`records`：`id TEXT`（主键），`sync_no INTEGER`，`existence INTEGER`，`bookmarked INTEGER`
+
+    `save()`与上次读取、保存的内容比较，只写入有变化的作品；`saveArtwork()`只写入一个作品。
+    '''
+    def __init__(self, db_file_path: str = ':memory:'):
+        self.DB_FILE_PATH = db_file_path
+        self.conn = sqlite3.connect(db_file_path, check_same_thread=False)
+        self.lock = threading.Lock()
+        # 上次读取或保存时每个作品的内容，用于比较出有变化的作品
+        self.saved_meta: dict[str, str] = dict()
+        self.saved_records: dict[str, tuple] = dict()
+        with self.lock, self.conn:
+            self.conn.execute('PRAGMA journal_mode=WAL')
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS artworks (
+                    id TEXT PRIMARY KEY,
+                    meta_json TEXT NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            ''')
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS records (
+                    id TEXT PRIMARY KEY,
+                    sync_no INTEGER NOT NULL,
+                    existence INTEGER NOT NULL,
+                    bookmarked INTEGER NOT NULL
+                )
+            ''')
+
+        # 日志
+        self.logger = logging.getLogger('Pixar2Tele')
+
+
+    def isEmpty(self) -> bool:
+        with self.lock:
+            return not any(self.conn.execute(f'SELECT 1 FROM {table} LIMIT 1').fetchone()
+                for table in ('artworks', 'records'))
+
+
+    def migrate(self, metadata_file_path: str, records_file_path: str) -> bool:
+        '''
+        数据库为空且存在原有的 JSON / CSV 时，一次性导入。
+
+        :return: 是否进行了迁移。
+        '''
+        if not self.isEmpty(): return False
+        if not os.path.exists(metadata_file_path) and not os.path.exists(records_file_path): return False
+        meta_dict, records_df = readJsonCsv(metadata_file_path, records_file_path)
+        self.save(meta_dict, records_df)
+        self.logger.info(f"[元数据存储] 已从 \"{metadata_file_path}\" 和 \"{records_file_path}\" 迁移 " +\
+            f"{len(meta_dict)} 个作品的元数据、{len(records_df)} 条同步记录。")
+        return True
+
+
+    def load(self) -> tuple[dict[str, dict], pd.DataFrame]:
+        ''':return: 与原 metadata.json / records.csv 相同结构的元数据字典和同步记录（按同步序号排列）。'''
+        with self.lock:
+            meta_rows = self.conn.execute('SELECT id, meta_json FROM artworks').fetchall()
+            record_rows = self.conn.execute(
+                'SELECT sync_no, id, existence, bookmarked FROM records ORDER BY sync_no').fetchall()
+        self.saved_meta = dict(meta_rows)
+        self.saved_records = {row[1]: row for row in record_rows}
+        meta_dict = {illust_id: json.loads(meta_json) for illust_id, meta_json in meta_rows}
+        records_df = pd.DataFrame(
+            [(sync_no, illust_id, bool(existence), bool(bookmarked))
+                for sync_no, illust_id, existence, bookmarked in record_rows],
+            columns=RECORDS_COLUMNS,
+        )
+        records_df.index = records_df['id']
+        return meta_dict, records_df
+
+
+    def save(self, meta_dict: dict[str, dict], records_df: pd.DataFrame):
+        '''
+        在一个事务中写入有变化的作品。不会删除字典中没有的作品：同时运行的任务（例如同步和手动输入）
+        各自持有读取时的字典，不能互相删掉对方新增的作品。
+        '''
+        meta_rows = {str(illust_id): dumpMeta(meta) for illust_id, meta in meta_dict.items()}
+        record_rows = {row[1]: row for row in recordRows(records_df)}
+        changed_meta = [(illust_id, meta_json) for illust_id, meta_json in meta_rows.items()
+            if self.saved_meta.get(illust_id) != meta_json]
+        changed_records = [row for illust_id, row in record_rows.items()
+            if self.saved_records.get(illust_id) != row]
+        if not (changed_meta or changed_records): return
+
+        now = time.time()
+        with self.lock, self.conn:
+            self.conn.executemany('INSERT OR REPLACE INTO artworks VALUES (?, ?, ?)',
+                [(illust_id, meta_json, now) for illust_id, meta_json in changed_meta])
+            self.conn.executemany('INSERT OR REPLACE INTO records (sync_no, id, existence, bookmarked) ' +\
+                'VALUES (?, ?, ?, ?)', changed_records)
+        self.saved_meta.update(changed_meta)
+        self.saved_records.update((row[1], row) for row in changed_records)
+
+
+    def saveArtwork(self, illust_id: str, meta: dict | None, record: tuple | None):
+        '''
+        在一个事务中写入一个作品的元数据和同步记录，为`None`的部分不写入。
+
+        :param record: `(syncNo, id, existence, bookmarked)`
+        '''
+        illust_id = str(illust_id)
+        meta_json = dumpMeta(meta) if meta is not None else None
+        if record is not None:
+            record = (int(record[0]), str(record[1]), int(bool(record[2])), int(bool(record[3])))
+        with self.lock, self.conn:
+            if meta_json is not None:
+                self.conn.execute('INSERT OR REPLACE INTO artworks VALUES (?, ?, ?)',
+                    (illust_id, meta_json, time.time()))
+            if record is not None:
+                self.conn.execute('INSERT OR REPLACE INTO records (sync_no, id, existence, bookmarked) ' +\
+                    'VALUES (?, ?, ?, ?)', record)
+        if meta_json is not None: self.saved_meta[illust_id] = meta_json
+        if record is not None: self.saved_records[illust_id] = record
+
+
+    def removeArtworks(self, illust_ids: list[str]):
+        '''删除作品的元数据（不删除同步记录）。'''
+        illust_ids = [str(illust_id) for illust_id in illust_ids]
+        with self.lock, self.conn:
+            self.conn.executemany('DELETE FROM artworks WHERE id = ?', [(illust_id,) for illust_id in illust_ids])
+        for illust_id in illust_ids: self.saved_meta.pop(illust_id, None)
+
+
+    def export(self, metadata_file_path: str, records_file_path: str):
+        '''导出为原有格式的 metadata.json 和 records.csv。'''
+        meta_dict, records_df = self.load()
+        saveJsonFile(metadata_file_path, meta_dict, indent=4, separators=(',', ': '))
+        records_df.to_csv(f'{records_file_path}.tmp', index=False)
+        os.replace(f'{records_file_path}.tmp', records_file_path)
+
+
+
+def dumpMeta(meta: dict) -> str:
+    return json.dumps(meta, ensure_ascii=False, separators=(',', ':'))
+
+
+def recordRows(records_df: pd.DataFrame) -> list[tuple]:
+    return [(int(sync_no), str(illust_id), int(bool(existence)), int(bool(bookmarked)))
+        for sync_no, illust_id, existence, bookmarked
+        in records_df[RECORDS_COLUMNS].itertuples(index=False, name=None)]
+
+
+def readJsonCsv(metadata_file_path: str, records_file_path: str) -> tuple[dict[str, dict], pd.DataFrame]:
+    '''读取原有格式的 metadata.json 和 records.csv，不存在时返回空的元数据和同步记录。'''
+    # 元数据
+    if os.path.exists(metadata_file_path):
+        with open(metadata_file_path, 'rt') as f:
+            meta_dict: dict[str, dict] = json.load(f)
+    else: meta_dict: dict[str, dict] = dict()
+    # 同步记录
+    if os.path.exists(records_file_path):
+        records_df = pd.read_csv(records_file_path,
+            dtype={'syncNo': int, 'id': str, 'existence': bool, 'bookmarked': bool})
+        records_df.index = records_df['id']
+        # 旧的同步记录没有收藏状态，默认都在收藏中
+        if 'bookmarked' not in records_df.columns: records_df['bookmarked'] = True
+    else: records_df = pd.DataFrame(columns=RECORDS_COLUMNS)
+    return meta_dict, records_df
+
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='元数据 SQLite 存储与 metadata.json / records.csv 互相转换')
+    parser.add_argument('action', choices=['migrate', 'export'])
+    parser.add_argument('db_file')
+    parser.add_argument('metadata_file')
+    parser.add_argument('records_file')
+    args = parser.parse_args()
+
+    store = MetaStore(args.db_file)
+    if args.action == 'migrate':
+        if not store.migrate(args.metadata_file, args.records_file): print('数据库不为空或没有可迁移的文件。')
+    else: store.export(args.metadata_file, args.records_file)
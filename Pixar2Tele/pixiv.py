@@ -3,13 +3,21 @@
 '''
 
 import os
-import time
+import hashlib
 import logging
-import zipfile
 import requests
-import imageio.v2 as imageio
+import threading
 
-from .utils import autoRetry
+from typing import Iterator
+from collections import deque
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor
+
+from .utils import autoRetry, sha256File, DownloadIncomplete
+from .ugoira import encodeUgoira, UGOIRA_FORMATS
+from .workers import ImagePool
+from .store import ArtworkStore
+from .governor import RateGovernor
 
 
 
@@ -20,13 +28,48 @@ class PixivTools:
             save_path: str,
             headers: dict,
             proxies: dict,
+            pool_size: int = 10,
+            max_concurrent_requests: int = 4,
+            download_workers: int = 4,
+            ugoira_format: str = 'gif',
+            rate_state_file_path: str = None,
+            max_request_rate: float = 20,
+            image_pool: ImagePool = None,
         ):
+        '''
+        :param rate_state_file_path: 保存学到的请求速率的文件，为空时每次从默认速率开始。
+        :param max_request_rate: 所有 Pixiv 请求合计的速率上限（次/秒）。
+        :param image_pool: 编码动图的进程池，为空时在调用线程中编码。
+        '''
         self.USER_ID = pixiv_user_id
         self.SAVE_PATH = save_path
         self.HEADERS = headers
         self.PROXIES = proxies
+        self.POOL_SIZE = pool_size
+        self.DOWNLOAD_WORKERS = download_workers
+        if ugoira_format not in UGOIRA_FORMATS:
+            raise ValueError(f"不支持的动图格式 {ugoira_format}，仅支持 {', '.join(UGOIRA_FORMATS)}。")
+        self.UGOIRA_FORMAT = ugoira_format
+        self.ImagePool = image_pool if image_pool is not None else ImagePool(max_workers=0)
+        # 按内容去重的本地存储，各版本的文件名都是硬链接
+        self.Store = ArtworkStore(save_path)
         
         self.ILLUST_TYPE_DICT = {0:'插画', 1:'漫画', 2:'动图', 3:'小说'}
+        # 收藏列表接口每页最多返回的作品数
+        self.MAX_PAGE_SIZE = 100
+
+        # 长连接会话：所有请求共用连接池、默认 headers 和代理，避免每次请求都重新握手
+        self.session = requests.Session()
+        self.session.headers.update(headers)
+        if proxies: self.session.proxies.update(proxies)
+        # pool_maxsize 为每个主机（www.pixiv.net、i.pximg.net 等）保持的连接数
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        # 全局请求预算：所有线程同时进行中的 Pixiv 请求不超过 max_concurrent_requests 个
+        self.request_budget = threading.BoundedSemaphore(max_concurrent_requests)
+        # 自适应请求速率：代替各处固定的请求间隔
+        self.Governor = RateGovernor(rate_state_file_path, max_rate=max_request_rate)
 
         # 日志
         self.logger = logging.getLogger('Pixar2Tele')
@@ -53,10 +96,10 @@ class PixivTools:
         '''
         artwork_infos = []
 
-        resp = autoRetry(requests.get)(
+        resp = self.get(
             f"https://www.pixiv.net/ajax/user/{self.USER_ID}/illusts/" + \
                 f"bookmarks?tag={tag}&offset={offset}&limit={limit}&rest={rest}",
-            headers=self.HEADERS, timeout=timeout, proxies=self.PROXIES,
+            timeout=timeout,
         ).json()
         datas = resp["body"]["works"]
         bookmark_tags: dict = resp["body"].get("bookmarkTags", dict())
@@ -88,6 +131,59 @@ class PixivTools:
         return artwork_infos
     
 
+    def crawlCollection(
+            self,
+            start_offset: int,
+            end_offset: int,
+            page_size: int = None,
+            prefetch: int = 3,
+            rest: str = 'show',
+            timeout: float = 30,
+        ) -> Iterator[list[dict]]:
+        '''
+        从旧到新逐页产出`[start_offset, end_offset)`范围内的收藏作品信息，后台提前并发获取后面的`prefetch`页。
+
+        收藏在抓取过程中发生变化时，作品会在相邻两页之间移动，已经产出过的作品会被去掉，
+        所以产出的页可能比`page_size`少，甚至为空。
+
+        :param page_size: 每页的作品数，默认为接口允许的最大值`self.MAX_PAGE_SIZE`。
+        :return: 每页作品信息按收藏顺序从旧到新排列。
+        :rtype: `Iterator[list[dict]]`
+        '''
+        def fetchPage(offset, limit):
+            return self.getCollectionInfos(
+                tag='', offset=offset, limit=limit, rest=rest, timeout=timeout)
+
+        page_size = min(page_size or self.MAX_PAGE_SIZE, self.MAX_PAGE_SIZE)
+        # 从最旧的一页开始，各页的 (offset, limit)
+        windows = []
+        for offset in range(end_offset - page_size, start_offset - page_size, -page_size):
+            lower = max(offset, start_offset)
+            windows.append((lower, offset + page_size - lower))
+
+        seen_ids = set()
+        executor = ThreadPoolExecutor(max_workers=max(prefetch, 1))
+        try:
+            pending = deque()
+            for window in windows:
+                pending.append(executor.submit(fetchPage, *window))
+                if len(pending) < prefetch: continue
+                yield self.dedupPage(pending.popleft().result(), seen_ids)
+            while pending:
+                yield self.dedupPage(pending.popleft().result(), seen_ids)
+        finally: executor.shutdown(wait=True, cancel_futures=True)
+    
+
+    def dedupPage(self, artwork_infos: list[dict], seen_ids: set) -> list[dict]:
+        '''把一页作品信息倒序为从旧到新，并去掉已经产出过的作品。'''
+        page = []
+        for artwork in reversed(artwork_infos):
+            if artwork['id'] in seen_ids: continue
+            seen_ids.add(artwork['id'])
+            page.append(artwork)
+        return page
+    
+
     def downloadArtwork(
             self,
             illust_id: str | int,
@@ -95,36 +191,48 @@ class PixivTools:
             illust_type: int,
             referer: str,
             timeout=30,
-            gap_time=1,
-        ):
+            max_workers: int = None,
+            previous_pages: list[str] = None,
+            previous_digests: list[dict] = None,
+        ) -> tuple[list[str], list[dict]]:
         '''
         将作品保存在指定文件夹中。
 
-        :return: 返回更新过的图片信息列表。
-        :rtype: `list[str]`
+        给出上一版本的`previous_pages`和`previous_digests`时，每页先发送条件请求，未修改（304）
+        或下载后内容的 SHA-256 与上一版本相同的页，继续使用上一版本的文件名。
+
+        :param max_workers: 多页作品同时下载的页数，默认为`self.DOWNLOAD_WORKERS`。
+
+        :return: 返回文件名列表，以及每页的摘要信息列表`[{"sha256", "etag", "lastModified", "url"}, ...]`。
+        :rtype: `tuple[list[str], list[dict]]`
         '''
         # 检查文件夹是否存在，如果不存在，则创建文件夹
         if not os.path.exists(self.SAVE_PATH): os.makedirs(self.SAVE_PATH)
-        # headers需要带上referer，pixiv才允许下载
-        download_headers = self.HEADERS
-        download_headers["referer"] = referer
-
-        # 插画、漫画
-        if illust_type == 0 or illust_type == 1:
-            pages = self.downloadPictures(
-                illust_id=illust_id, version=version, 
-                download_headers=download_headers,
-                timeout=timeout, gap_time=gap_time,
-            )
-        # 动图
-        elif illust_type == 2:
-            pages = self.downloadUgoira(
-                illust_id=illust_id, version=version,
-                download_headers=download_headers, timeout=timeout,
-            )
-        else: raise ValueError(f"仅支持插画(0)、漫画(1)、动图(2)，不支持当前类型 {illust_type}。")
+        # headers需要带上referer，pixiv才允许下载；会话已带默认 headers，这里只补充 referer，
+        # 不能修改共享的 self.HEADERS，否则并发下载时会互相覆盖
+        download_headers = {"referer": referer}
+
+        try:
+            # 插画、漫画
+            if illust_type == 0 or illust_type == 1:
+                pages, digests = self.downloadPictures(
+                    illust_id=illust_id, version=version, 
+                    download_headers=download_headers,
+                    timeout=timeout, max_workers=max_workers,
+                    previous_pages=previous_pages, previous_digests=previous_digests,
+                )
+            # 动图
+            elif illust_type == 2:
+                pages, digests = self.downloadUgoira(
+                    illust_id=illust_id, version=version,
+                    download_headers=download_headers, timeout=timeout,
+                    previous_pages=previous_pages, previous_digests=previous_digests,
+                )
+            else: raise ValueError(f"仅支持插画(0)、漫画(1)、动图(2)，不支持当前类型 {illust_type}。")
+        # 每个作品只写入一次存储清单，部分页下载失败时已加入存储的页也要记录
+        finally: self.Store.save()
         
-        return pages
+        return pages, digests
 
 
     def downloadPictures(
@@ -133,37 +241,57 @@ class PixivTools:
             version: int,
             download_headers: dict,
             timeout=30,
-            gap_time=1,
-        ) -> list[str]:
+            max_workers: int = None,
+            previous_pages: list[str] = None,
+            previous_digests: list[dict] = None,
+        ) -> tuple[list[str], list[dict]]:
         '''
-        下载插画、漫画。
+        下载插画、漫画。多页作品最多同时下载`max_workers`页，所有请求仍受全局请求预算限制。
 
-        :return: 返回文件名列表。
-        :rtype: `list[str]`
+        :return: 返回文件名列表和每页的摘要信息列表，按页码顺序排列。
+        :rtype: `tuple[list[str], list[dict]]`
         '''
+        def downloadPage(idx: int, download_url: str, file_name: str):
+            previous_name, previous_digest = self.getPreviousPage(idx, previous_pages, previous_digests)
+            file_path = os.path.join(self.SAVE_PATH, file_name)
+            if os.path.exists(file_path):
+                digest = {"sha256": sha256File(file_path), "etag": None, "lastModified": None, "url": download_url}
+            else:
+                result = self.downloadFile(download_url, file_path, headers=download_headers, timeout=timeout,
+                    validators=self.getValidators(previous_name, previous_digest, download_url))
+                if result["notModified"]: return previous_name, previous_digest
+                digest = {"sha256": result["sha256"], "etag": result["etag"],
+                    "lastModified": result["lastModified"], "url": download_url}
+            file_name = self.reusePreviousPage(file_name, digest, previous_name, previous_digest)
+            self.Store.add(file_name, digest["sha256"])
+            return file_name, digest
+        
+        if max_workers is None: max_workers = self.DOWNLOAD_WORKERS
+
         # 请求图片详情
-        image_data = autoRetry(requests.get)(
+        image_data = self.get(
             f"https://www.pixiv.net/ajax/illust/{illust_id}/pages?lang=zh",
-            headers=download_headers, timeout=timeout, proxies=self.PROXIES,
+            headers=download_headers, timeout=timeout,
         ).json()["body"]
 
-        pages = []
-        for page in image_data:
+        jobs = []
+        for idx, page in enumerate(image_data):
             # 获取下载链接和文件名
             download_url:str = page["urls"]["original"]
             file_stem, file_suffix = os.path.splitext(download_url.split('/')[-1])
-            file_name = f'{file_stem}_v{version}{file_suffix}'
-            file_path = os.path.join(self.SAVE_PATH, file_name)
-            pages.append(file_name)
-
-            # 当图片没被下载时，下载图片
-            if not os.path.exists(file_path):
-                resp = autoRetry(requests.get)(download_url, 
-                    headers=download_headers, timeout=timeout, proxies=self.PROXIES)
-                with open(file_path, "wb") as file: file.write(resp.content)
-                time.sleep(gap_time)
+            jobs.append((idx, download_url, f'{file_stem}_v{version}{file_suffix}'))
+        
+        if max_workers <= 1 or len(jobs) <= 1:
+            results = [downloadPage(*job) for job in jobs]
+        else:
+            with ThreadPoolExecutor(max_workers=min(max_workers, len(jobs))) as executor:
+                futures = [executor.submit(downloadPage, *job) for job in jobs]
+                # 按页码顺序取结果，任何一页下载失败都会在这里重新报错
+                results = [future.result() for future in futures]
     
-        return pages
+        pages = [file_name for file_name, _ in results]
+        digests = [digest for _, digest in results]
+        return pages, digests
 
     
     def downloadUgoira(
@@ -172,67 +300,298 @@ class PixivTools:
             version: int,
             download_headers: dict,
             timeout=30,
-        ) -> list[str]:
+            previous_pages: list[str] = None,
+            previous_digests: list[dict] = None,
+        ) -> tuple[list[str], list[dict]]:
         '''
-        下载动图。
+        下载动图，按`self.UGOIRA_FORMAT`编码。条件请求针对动图 zip，SHA-256 针对编码后的动图文件。
 
-        :return: 返回文件名列表，只有一个动图文件。
-        :rtype: `list[str]`
+        :return: 返回文件名列表和摘要信息列表，都只有一项。
+        :rtype: `tuple[list[str], list[dict]]`
         '''
+        previous_name, previous_digest = self.getPreviousPage(0, previous_pages, previous_digests)
         # 动图的保存路径
         file_stem = f"{illust_id}_v{version}"
-        file_name = f"{file_stem}.gif"
+        file_ext = UGOIRA_FORMATS[self.UGOIRA_FORMAT]
+        file_name = f"{file_stem}{file_ext}"
         file_path = os.path.join(self.SAVE_PATH, file_name)
+        validators = {"etag": None, "lastModified": None, "url": None}
         
         # 当动图还未下载时，下载动图帧
         if not os.path.exists(file_path):
-            ugoira_meta = autoRetry(requests.get)(
+            ugoira_meta = self.get(
                 f"https://www.pixiv.net/ajax/illust/{illust_id}/ugoira_meta", 
-                headers=download_headers, timeout=timeout, proxies=self.PROXIES,
+                headers=download_headers, timeout=timeout,
             ).json()
-            ugoira_zip = autoRetry(requests.get)(
-                ugoira_meta['body']['originalSrc'], 
-                headers=download_headers, timeout=timeout, proxies=self.PROXIES,
-            )
-            
             zip_path = os.path.join(self.SAVE_PATH, f"{illust_id}.zip")
-            with open(zip_path, 'wb') as f: f.write(ugoira_zip.content)
-            with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-                zip_ref.extractall(os.path.join(self.SAVE_PATH, f"{illust_id}"))
-            os.remove(zip_path)
-            
-            # 将动图帧组合为动图，并保存
-            frames = ugoira_meta['body']['frames']
-            frame_files = [os.path.join(self.SAVE_PATH, f"{illust_id}", f"{frame['file']}") 
-                for frame in frames]
-            durations = [frame['delay'] / 1000 for frame in frames]
+            zip_url = ugoira_meta['body']['originalSrc']
+            result = self.downloadFile(zip_url, zip_path,
+                headers=download_headers, timeout=timeout,
+                validators=self.getValidators(previous_name, previous_digest, zip_url))
+            if result["notModified"]: return [previous_name], [previous_digest]
+            validators = {"etag": result["etag"], "lastModified": result["lastModified"], "url": zip_url}
             
-            images = [imageio.imread(frame_file) for frame_file in frame_files]
-            imageio.mimsave(file_path, images, duration=durations)
-            
-            # 删除动图帧
-            for frame_file in frame_files: os.remove(frame_file)
-            os.rmdir(os.path.join(self.SAVE_PATH, f"{illust_id}"))
+            # 直接从 zip 中逐帧解码并编码为动图，先写入临时文件再重命名，避免中断时留下不完整的动图
+            temp_file_path = os.path.join(self.SAVE_PATH, f"{file_stem}.part{file_ext}")
+            self.ImagePool.call(encodeUgoira, zip_path, ugoira_meta['body']['frames'], temp_file_path,
+                output_format=self.UGOIRA_FORMAT)
+            os.replace(temp_file_path, file_path)
+            os.remove(zip_path)
+
+        digest = {"sha256": sha256File(file_path), **validators}
+        file_name = self.reusePreviousPage(file_name, digest, previous_name, previous_digest)
+        self.Store.add(file_name, digest["sha256"])
+        return [file_name], [digest]
+
+
+    def getPreviousPage(
+            self,
+            idx: int,
+            previous_pages: list[str] | None,
+            previous_digests: list[dict] | None,
+        ) -> tuple[str | None, dict | None]:
+        '''取出上一版本第`idx`页的文件名和摘要信息，没有时返回`None`。'''
+        if not previous_pages or not previous_digests or idx >= len(previous_pages): return None, None
+        if idx >= len(previous_digests) or not previous_digests[idx]: return None, None
+        return previous_pages[idx], previous_digests[idx]
+
+
+    def getValidators(
+            self,
+            previous_name: str | None,
+            previous_digest: dict | None,
+            url: str,
+        ) -> dict | None:
+        '''
+        只有上一版本同一页的下载地址与`url`相同、且文件还在磁盘上时才发送条件请求：
+        原图地址带有更新时间，页被插入或调换顺序后按页码对应的是另一个文件，304 会让变化的页保持旧内容；
+        文件已被清理时，304 会让这一页指向不存在的文件。其他情况完整下载，再按 SHA-256 判断是否变化。
+        '''
+        if previous_name is None or previous_digest.get("url") != url: return None
+        if not os.path.exists(os.path.join(self.SAVE_PATH, previous_name)): return None
+        return previous_digest
 
-        return [file_name]
 
+    def reusePreviousPage(
+            self,
+            file_name: str,
+            digest: dict,
+            previous_name: str | None,
+            previous_digest: dict | None,
+        ) -> str:
+        '''
+        新下载的页与上一版本内容相同时，删除新文件，继续使用上一版本的文件名（如果上一版本的文件已被清理，
+        就把新文件改回旧文件名）。
+
+        :return: 这一页最终使用的文件名。
+        '''
+        if (previous_name is None or previous_name == file_name
+        or previous_digest.get("sha256") != digest["sha256"]):
+            return file_name
+        file_path = os.path.join(self.SAVE_PATH, file_name)
+        previous_path = os.path.join(self.SAVE_PATH, previous_name)
+        if os.path.exists(previous_path): os.remove(file_path)
+        else: os.replace(file_path, previous_path)
+        return previous_name
+
+
+    def downloadFile(
+            self,
+            url: str,
+            file_path: str,
+            headers: dict = None,
+            timeout: float = 30,
+            chunk_size: int = 1024 * 1024,
+            validators: dict = None,
+        ) -> dict:
+        '''
+        流式下载文件：分块写入`<file_path>.part`，校验 Content-Length 后原子重命名为`file_path`，
+        写入的同时计算 SHA-256。如果上次下载中断留下了`.part`文件，会用 HTTP Range 从断点继续下载。
+
+        :param validators: 上次下载同一文件时记录的`{"etag", "lastModified"}`，给出时发送条件请求，
+            文件未修改（304）时不会写入任何文件。
+        :return: `{"sha256", "etag", "lastModified", "notModified"}`
+        :rtype: `dict`
+        :raise DownloadIncomplete: 下载的字节数与服务器声明的不一致（会自动重试）。
+        '''
+        part_path = file_path + '.part'
+
+        def streamOnce():
+            resume_from = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+            request_headers = dict(headers or {})
+            if resume_from: request_headers['Range'] = f'bytes={resume_from}-'
+            # 断点续传时不发送条件请求，以免 304 后临时文件无法完成
+            elif validators:
+                if validators.get('etag'): request_headers['If-None-Match'] = validators['etag']
+                if validators.get('lastModified'):
+                    request_headers['If-Modified-Since'] = validators['lastModified']
+
+            self.Governor.acquire()
+            with self.request_budget:
+                try: resp = self.session.get(url, headers=request_headers, timeout=timeout, stream=True)
+                except requests.RequestException as e:
+                    self.Governor.onError(e)
+                    raise
+                # 下载的耗时取决于文件大小，只用收到响应头的延迟判断服务器状态
+                self.Governor.onResponse(resp.status_code, resp.elapsed.total_seconds())
+                with resp:
+                    if resp.status_code == 304:
+                        return {"sha256": None, "notModified": True,
+                            "etag": resp.headers.get('ETag', validators.get('etag')),
+                            "lastModified": resp.headers.get('Last-Modified', validators.get('lastModified'))}
+                    # 断点位置超出文件大小，说明临时文件已损坏，删除后重新下载
+                    if resp.status_code == 416:
+                        os.remove(part_path)
+                        raise DownloadIncomplete(f"断点续传位置无效，已删除临时文件：{part_path}")
+                    resp.raise_for_status()
+
+                    # 206：服务器接受断点续传，追加写入；200：服务器返回完整文件，从头写入
+                    digest = hashlib.sha256()
+                    if resp.status_code == 206:
+                        mode = 'ab'
+                        content_range = resp.headers.get('Content-Range', '')
+                        total = content_range.rsplit('/', 1)[-1]
+                        expected_size = int(total) if total.isdigit() else None
+                        # 已下载的部分也要计入摘要
+                        with open(part_path, 'rb') as file:
+                            while chunk := file.read(chunk_size): digest.update(chunk)
+                    else:
+                        mode = 'wb'
+                        content_length = resp.headers.get('Content-Length')
+                        expected_size = int(content_length) if content_length else None
+                    # 经过压缩传输时 Content-Length 不是文件大小，无法校验
+                    if resp.headers.get('Content-Encoding', 'identity') != 'identity':
+                        expected_size = None
+
+                    with open(part_path, mode) as file:
+                        for chunk in resp.iter_content(chunk_size=chunk_size):
+                            file.write(chunk)
+                            digest.update(chunk)
+
+            actual_size = os.path.getsize(part_path)
+            if expected_size is not None and actual_size != expected_size:
+                raise DownloadIncomplete(
+                    f"下载不完整：{url}，应为 {expected_size} 字节，实际 {actual_size} 字节。")
+            os.replace(part_path, file_path)
+            return {"sha256": digest.hexdigest(), "notModified": False,
+                "etag": resp.headers.get('ETag'), "lastModified": resp.headers.get('Last-Modified')}
+
+        return autoRetry(streamOnce, endpoint='pixiv')()
+
+
+    def listCollectionIds(
+            self,
+            rest: str = 'show',
+            max_workers: int = 4,
+            timeout: float = 30,
+        ) -> set[str]:
+        '''
+        只获取全部收藏的作品ID：按接口允许的最大页并发请求，每个作品只保留`id`。
+
+        :rtype: `set[str]`
+        '''
+        def fetchIds(offset):
+            resp = self.get(
+                f"https://www.pixiv.net/ajax/user/{self.USER_ID}/illusts/" + \
+                    f"bookmarks?tag=&offset={offset}&limit={self.MAX_PAGE_SIZE}&rest={rest}",
+                timeout=timeout,
+            ).json()
+            return resp["body"]["total"], [str(work["id"]) for work in resp["body"]["works"]]
+
+        total, collection_ids = fetchIds(0)
+        collection_ids = set(collection_ids)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for _, page_ids in executor.map(fetchIds, range(self.MAX_PAGE_SIZE, total, self.MAX_PAGE_SIZE)):
+                collection_ids.update(page_ids)
+        return collection_ids
+    
 
     def countCollection(self) -> int:
         '''获取收藏总数。'''
-        resp = autoRetry(requests.get)(
+        resp = self.get(
             f"https://www.pixiv.net/ajax/user/{self.USER_ID}" +\
                 "/illusts/bookmarks?tag=&offset=0&limit=1&rest=show",
-            headers=self.HEADERS,
         )
         count = resp.json()["body"]["total"]
         return count
     
 
     def exists(self, illust_id, timeout: float = 20) -> bool:
-        resp = autoRetry(requests.get)(
-            f"https://www.pixiv.net/ajax/illust/{illust_id}",
-            headers=self.HEADERS, timeout=timeout, proxies=self.PROXIES,
-        )
+        resp = self.get(f"https://www.pixiv.net/ajax/illust/{illust_id}", timeout=timeout)
         return not resp.json()['error']
+    
+
+    def existsByAuthor(
+            self,
+            author_user_id: str | int,
+            illust_ids: list[str | int],
+            timeout: float = 20,
+        ) -> dict[str, bool]:
+        '''
+        用作者主页的作品接口一次查询同一作者的多个作品是否存活。
+
+        :param illust_ids: 同一作者的作品ID，一次不要超过 48 个。
+        :return: `{作品ID: 是否存活}`，接口只返回存活的作品，不在其中的即为不存活。
+        :rtype: `dict[str, bool]`
+        :raise LookupError: 接口报错（例如作者账号已注销），无法判断这些作品是否存活。
+        '''
+        query = '&'.join(f"ids[]={illust_id}" for illust_id in illust_ids)
+        resp = self.get(
+            f"https://www.pixiv.net/ajax/user/{author_user_id}/profile/illusts?" +\
+                f"{query}&work_category=illustManga&is_first_page=0&lang=zh",
+            timeout=timeout,
+        ).json()
+        if resp['error']:
+            raise LookupError(f"无法查询作者 {author_user_id} 的作品：{resp.get('message')}")
+        works = resp['body'].get('works') or dict()
+        return {str(illust_id): str(illust_id) in works for illust_id in illust_ids}
+
+
+    def get(
+            self,
+            url: str,
+            headers: dict = None,
+            timeout: float = 30,
+            **kwargs,
+        ) -> requests.Response:
+        '''
+        通过长连接会话发送 GET 请求，自动重试。
+
+        :param headers: 额外的 headers，会与会话的默认 headers 合并。
+        '''
+        def budgetedGet(*args, **kwargs):
+            self.Governor.acquire()
+            # 只在请求进行时占用预算，重试等待期间不占用
+            with self.request_budget:
+                try: resp = self.session.get(*args, **kwargs)
+                except requests.RequestException as e:
+                    self.Governor.onError(e)
+                    raise
+            self.Governor.onResponse(resp.status_code, resp.elapsed.total_seconds())
+            # 限流和服务器错误交给重试策略处理；其他 4xx（如作品 404）由调用方解析返回的 JSON
+            if resp.status_code == 429 or resp.status_code >= 500: resp.raise_for_status()
+            return resp
+        return autoRetry(budgetedGet, endpoint='pixiv')(url, headers=headers, timeout=timeout, **kwargs)
+
+
+    def getConnectionStats(self) -> dict[str, dict[str, int]]:
+        '''
+        统计各主机连接池的连接复用情况。
+
+        :return: `{主机: {"connections": 新建连接数, "requests": 请求数, "reused": 复用次数}}`
+        :rtype: `dict[str, dict[str, int]]`
+        '''
+        stats = dict()
+        adapters = {id(adapter): adapter for adapter in self.session.adapters.values()}
+        for adapter in adapters.values():
+            pools = adapter.poolmanager.pools
+            for key in pools.keys():
+                pool = pools.get(key)
+                if pool is None: continue
+                host_stats = stats.setdefault(pool.host, {"connections": 0, "requests": 0, "reused": 0})
+                host_stats["connections"] += pool.num_connections
+                host_stats["requests"] += pool.num_requests
+                host_stats["reused"] += max(pool.num_requests - pool.num_connections, 0)
+        return stats
 
 
@@ -0,0 +1,165 @@
+'''
+Telegram 发送调度：所有 Bot 调用按目标聊天排队，用令牌桶控制速率，代替固定的`time.sleep`。
+
+Telegram 的限制（https://core.telegram.org/bots/faq#my-bot-is-hitting-limits-how-do-i-avoid-this）：
+- 同一私聊每秒不超过 1 条；
+- 同一群组/频道每分钟不超过 20 条；
+- 所有聊天合计每秒不超过 30 条。
+'''
+
+import time
+import logging
+import threading
+
+from telebot import TeleBot
+from telebot.apihelper import ApiTelegramException
+
+
+
+class TokenBucket:
+    '''
+    令牌桶：每秒补充`rate`个令牌，最多存`capacity`个；每次调用消耗一个令牌，没有令牌时等待。
+    '''
+    def __init__(self, rate: float, capacity: float):
+        self.RATE = rate
+        self.CAPACITY = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self.paused_until = 0
+        self.lock = threading.Lock()
+
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                if now < self.paused_until: wait = self.paused_until - now
+                else:
+                    self.tokens = min(self.tokens + (now - self.updated_at) * self.RATE, self.CAPACITY)
+                    self.updated_at = now
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return
+                    wait = (1 - self.tokens) / self.RATE
+            time.sleep(wait)
+
+
+    def pause(self, seconds: float):
+        '''暂停`seconds`秒，恢复后从空桶开始补充令牌。'''
+        with self.lock:
+            now = time.monotonic()
+            self.paused_until = max(self.paused_until, now + seconds)
+            self.tokens = 0
+            self.updated_at = self.paused_until
+
+
+
+class TelegramScheduler:
+    '''
+    每个聊天一个令牌桶，另有一个所有聊天共用的全局令牌桶。
+
+    群组/频道的桶允许`group_burst`条突发，补充速率为`(group_per_minute - group_burst) / 60`，
+    保证任意一分钟内都不超过`group_per_minute`条。
+    '''
+    def __init__(
+            self,
+            global_per_second: float = 30,
+            private_per_second: float = 1,
+            group_per_minute: float = 20,
+            group_burst: int = 3,
+        ):
+        self.global_bucket = TokenBucket(global_per_second, global_per_second)
+        self.PRIVATE_PER_SECOND = private_per_second
+        self.GROUP_RATE = max(group_per_minute - group_burst, 1) / 60
+        self.GROUP_BURST = group_burst
+        self.chat_buckets: dict[str, TokenBucket] = dict()
+        self.lock = threading.Lock()
+
+        # 日志
+        self.logger = logging.getLogger('Pixar2Tele')
+
+
+    def getChatBucket(self, chat_id: int | str) -> TokenBucket:
+        with self.lock:
+            key = str(chat_id)
+            if key not in self.chat_buckets:
+                # 私聊的ID为正数，群组、频道的ID为负数
+                if key.lstrip('-').isdigit() and int(key) > 0:
+                    self.chat_buckets[key] = TokenBucket(self.PRIVATE_PER_SECOND, 1)
+                else: self.chat_buckets[key] = TokenBucket(self.GROUP_RATE, self.GROUP_BURST)
+            return self.chat_buckets[key]
+
+
+    def acquire(self, chat_id: int | str = None):
+        '''等待目标聊天和全局都有余量。`chat_id`为空时只受全局限制。'''
+        if chat_id is not None: self.getChatBucket(chat_id).acquire()
+        self.global_bucket.acquire()
+
+
+    def pause(self, chat_id: int | str, seconds: float):
+        '''Telegram 返回 429 时，只暂停受影响的聊天。'''
+        self.logger.warning(f"[发送调度] 聊天 {chat_id} 触发限流，暂停 {seconds} 秒。")
+        self.getChatBucket(chat_id).pause(seconds)
+
+
+
+class ScheduledBot:
+    '''
+    TeleBot 的代理：向聊天发送或修改消息的方法先经过`TelegramScheduler`排队，其他属性直接转发给原 Bot。
+    '''
+    # 方法名: (chat_id 参数的位置, 是否受单个聊天的速率限制)
+    CHAT_ID_ARGS = {
+        'send_message': (0, True),
+        'send_photo': (0, True),
+        'send_document': (0, True),
+        'send_video': (0, True),
+        'send_animation': (0, True),
+        'send_media_group': (0, True),
+        'forward_message': (0, True),
+        'copy_message': (0, True),
+        'edit_message_text': (1, True),
+        'edit_message_caption': (1, True),
+        'edit_message_media': (1, True),
+        'pin_chat_message': (0, True),
+        'delete_message': (0, False),
+        'unpin_all_chat_messages': (0, False),
+    }
+
+    def __init__(self, bot: TeleBot, scheduler: TelegramScheduler = None):
+        self.bot = bot
+        self.Scheduler = scheduler if scheduler is not None else TelegramScheduler()
+        self.observers = []
+
+        # 日志
+        self.logger = logging.getLogger('Pixar2Tele')
+
+
+    def addObserver(self, observer):
+        '''
+        调用成功后通知观察者：`observer(方法名, args, kwargs, 返回值)`，例如用于记录发出的消息。
+        '''
+        self.observers.append(observer)
+
+
+    def __getattr__(self, name: str):
+        attr = getattr(self.bot, name)
+        if name not in self.CHAT_ID_ARGS: return attr
+        position, per_chat = self.CHAT_ID_ARGS[name]
+
+        def scheduled(*args, **kwargs):
+            chat_id = kwargs['chat_id'] if 'chat_id' in kwargs else \
+                args[position] if len(args) > position else None
+            self.Scheduler.acquire(chat_id if per_chat else None)
+            try: result = attr(*args, **kwargs)
+            except ApiTelegramException as e:
+                retry_after = (e.result_json.get('parameters') or dict()).get('retry_after')
+                if e.error_code == 429 and retry_after and chat_id is not None:
+                    self.Scheduler.pause(chat_id, retry_after)
+                raise
+            for observer in self.observers:
+                try: observer(name, args, kwargs, result)
+                except Exception as e: self.logger.warning(f"[发送调度] {name} 的观察者出错：{e}")
+            return result
+        # 保留原 Bot 作为绑定对象，autoRetry 据此识别为 telegram 接口
+        scheduled.__self__ = self.bot
+        return scheduled
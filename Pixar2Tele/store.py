@@ -0,0 +1,168 @@
+'''
+按内容寻址的本地作品存储：文件内容按 SHA-256 保存在`<save_path>/.blobs/`中，
+`save_path`下带版本号的文件名（`{stem}_v{version}{ext}`）都是指向这些内容的硬链接。
+同一内容无论对应多少个版本的文件名，磁盘上都只占一份空间。
+'''
+
+import os
+import time
+import logging
+import threading
+
+from .utils import sha256File, loadJsonFile, saveJsonFile
+
+
+
+class ArtworkStore:
+    '''
+    - 清单文件（`<save_path>/.blobs/manifest.json`）的格式：
+    ```
+    {
+        "files": {
+            "<file_name>": {"sha256": <: str>, "addedAt": <加入存储的时间戳: float>},
+            ...
+        },
+        "refs": {
+            "<sha256>": <引用此内容的文件名数量: int>,
+            ...
+        }
+    }
+    ```
+
+    `add()`、`remove()`只修改内存中的清单并标记为未保存，由调用方在一个作品下载完成、
+    一轮清理结束等时机调用`save()`统一写入，避免每页都整体重写一次清单。
+    '''
+    def __init__(self, root: str, blob_dir_name: str = '.blobs'):
+        self.ROOT = os.path.abspath(root)
+        self.BLOB_PATH = os.path.join(self.ROOT, blob_dir_name)
+        self.MANIFEST_FILE_PATH = os.path.join(self.BLOB_PATH, 'manifest.json')
+
+        os.makedirs(self.BLOB_PATH, exist_ok=True)
+        self.manifest = loadJsonFile(self.MANIFEST_FILE_PATH, default={"files": {}, "refs": {}})
+        # 下载多页作品时会有多个线程同时写入
+        self.lock = threading.RLock()
+        # 清单是否有未写入文件的修改
+        self.dirty = False
+        # 文件系统不支持硬链接时，文件保持原样，不再纳入存储
+        self.hardlink_supported = True
+
+        # 日志
+        self.logger = logging.getLogger('Pixar2Tele')
+
+
+    def getBlobPath(self, sha256: str) -> str:
+        return os.path.join(self.BLOB_PATH, sha256[:2], sha256)
+
+
+    def isManaged(self, file_name: str) -> bool:
+        return file_name in self.manifest["files"]
+
+
+    def getAddedAt(self, file_name: str) -> float | None:
+        entry = self.manifest["files"].get(file_name)
+        return entry["addedAt"] if entry else None
+
+
+    def add(self, file_name: str, sha256: str = None) -> str | None:
+        '''
+        将`save_path`下已写好的文件纳入存储：内容已存在时，用指向已有内容的硬链接替换该文件；
+        否则把该文件链接为新的内容。重复加入同一文件不会重复计数。
+
+        :param sha256: 文件内容的 SHA-256，已知时可省去重新计算。
+        :return: 文件内容的 SHA-256，文件系统不支持硬链接时返回`None`。
+        '''
+        if not self.hardlink_supported: return None
+        file_path = os.path.join(self.ROOT, file_name)
+        if sha256 is None: sha256 = sha256File(file_path)
+
+        with self.lock:
+            entry = self.manifest["files"].get(file_name)
+            blob_path = self.getBlobPath(sha256)
+            if (entry and entry["sha256"] == sha256
+            and os.path.exists(blob_path) and os.path.samefile(file_path, blob_path)):
+                return sha256
+
+            try:
+                if os.path.exists(blob_path):
+                    # 先链接到临时文件名再原子替换，避免中途失败时丢失原文件
+                    temp_path = f'{file_path}.link'
+                    if os.path.exists(temp_path): os.remove(temp_path)
+                    os.link(blob_path, temp_path)
+                    os.replace(temp_path, file_path)
+                else:
+                    os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+                    os.link(file_path, blob_path)
+            except OSError as e:
+                self.hardlink_supported = False
+                self.logger.warning(f"[本地存储] 无法创建硬链接，之后的文件不再去重：{e}")
+                return None
+
+            if entry: self.release(entry["sha256"])
+            self.manifest["files"][file_name] = {"sha256": sha256, "addedAt": time.time()}
+            self.manifest["refs"][sha256] = self.manifest["refs"].get(sha256, 0) + 1
+            self.dirty = True
+        return sha256
+
+
+    def remove(self, file_name: str):
+        '''删除`save_path`下的文件；如果它是某个内容的最后一个引用，同时删除该内容。'''
+        file_path = os.path.join(self.ROOT, file_name)
+        with self.lock:
+            if os.path.exists(file_path): os.remove(file_path)
+            entry = self.manifest["files"].pop(file_name, None)
+            if entry:
+                self.release(entry["sha256"])
+                self.dirty = True
+
+
+    def release(self, sha256: str):
+        '''引用计数减一，归零时删除内容。调用方负责保存清单。'''
+        count = self.manifest["refs"].get(sha256, 0) - 1
+        if count > 0:
+            self.manifest["refs"][sha256] = count
+            return
+        self.manifest["refs"].pop(sha256, None)
+        blob_path = self.getBlobPath(sha256)
+        if os.path.exists(blob_path): os.remove(blob_path)
+
+
+    def prune(self) -> int:
+        '''
+        修复清单与磁盘不一致的情况：移除文件已被删除的清单项，删除没有引用的内容。
+
+        :return: 释放的字节数。
+        '''
+        freed = 0
+        with self.lock:
+            for file_name in list(self.manifest["files"]):
+                if not os.path.exists(os.path.join(self.ROOT, file_name)):
+                    self.release(self.manifest["files"].pop(file_name)["sha256"])
+                    self.dirty = True
+            for dir_path, _, file_names in os.walk(self.BLOB_PATH):
+                for sha256 in file_names:
+                    # 跳过清单文件等非内容文件
+                    if len(sha256) != 64 or sha256 in self.manifest["refs"]: continue
+                    blob_path = os.path.join(dir_path, sha256)
+                    freed += os.path.getsize(blob_path)
+                    os.remove(blob_path)
+            self.save()
+        return freed
+
+
+    def getStats(self) -> dict[str, int]:
+        '''
+        :return: `{"files": 文件名数量, "blobs": 不同内容数量, "bytes": 实际占用的字节数}`
+        '''
+        with self.lock:
+            blob_bytes = sum(os.path.getsize(self.getBlobPath(sha256))
+                for sha256 in self.manifest["refs"] if os.path.exists(self.getBlobPath(sha256)))
+            return {"files": len(self.manifest["files"]),
+                "blobs": len(self.manifest["refs"]), "bytes": blob_bytes}
+
+
+    def save(self):
+        '''清单有修改时写入文件。'''
+        with self.lock:
+            if not self.dirty: return
+            saveJsonFile(self.MANIFEST_FILE_PATH, self.manifest)
+            self.dirty = False
@@ -1,18 +1,21 @@
 import os
-import time
-import json
 import logging
 import pandas as pd
 
 from html import escape
 from threading import Event
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime
 from telebot import TeleBot
 from telebot.types import Message
 
-from .utils import autoRetry, MessageSendingFailed
+from .utils import autoRetry, sha256File, MessageSendingFailed, loadJsonFile, saveJsonFile
 from .pixiv import PixivTools
 from .telegram import TelegramTools
+from .existence import ExistenceChecker
+from .workers import ImagePool
+from .metastore import MetaStore
 
 
 
@@ -39,11 +42,23 @@ class Syncher:
             "channelMessageId": <: int>,
             "groupMessageId": <: int>,
             "groupDocumentMessageIds": <: list[int]>,
+            "pageDocumentMessageIds": <每页文件的群组消息ID: list[list[int]]>,
+            "pageDigests": <每页的摘要信息: list[{"sha256": str, "etag": str, "lastModified": str, "url": str}]>,
+            "existenceCheckedAt": <: str>,
+            "existenceChangedAt": <: str>,
+            "bookmarked": <: bool>,
+            "manuallyInput": <手动输入的作品，不参与收藏状态比对: bool>, #NOTE: 只有手动输入的作品有此项
         },
         ...
     }
     ```
-    - 同步记录表的列：`'syncNo', 'id', 'existence'`
+    - 同步记录表的列：`'syncNo', 'id', 'existence', 'bookmarked'`
+    - 同步状态（与元数据同目录的`sync_state.json`）：
+    ```
+    {
+        "watermark": <上次同步完成时最新的几个收藏: list[str]>,
+    }
+    ```
     '''
     def __init__(
             self,
@@ -60,6 +75,17 @@ class Syncher:
             temp_path: str,
             headers: dict,
             proxies: dict,
+            pool_size: int = 10,
+            max_concurrent_requests: int = 4,
+            download_workers: int = 4,
+            ugoira_format: str = 'gif',
+            existence_workers: int = 4,
+            existence_checks_per_run: int = 500,
+            max_request_rate: float = 20,
+            telegram_local_mode: bool = False,
+            temp_space_limit: int = 10 * 1000 ** 3,
+            image_workers: int = 2,
+            image_tasks_per_worker: int = 20,
         ):
         self.bot = bot
 
@@ -68,23 +94,49 @@ class Syncher:
         self.GROUP_ID = group_id
         self.METADATA_FILE_PATH = metadata_file_path
         self.RECORDS_FILE_PATH = records_file_path
+        self.SYNC_STATE_FILE_PATH = os.path.join(os.path.dirname(metadata_file_path), 'sync_state.json')
+        # 元数据和同步记录保存在 SQLite 中，第一次运行时从原有的 metadata.json / records.csv 迁移
+        self.Meta = MetaStore(os.path.join(os.path.dirname(metadata_file_path), 'metadata.sqlite3'))
+        self.Meta.migrate(metadata_file_path, records_file_path)
+        self.WATERMARK_SIZE = 10
         self.ERR404_PHOTO_FILE_PATH = err404_cover_file_path
         self.SAVE_PATH = save_path
         self.TEMP_PATH = temp_path
 
         self.ILLUST_TYPE_DICT = {0:'插画', 1:'漫画', 2:'动图', 3:'小说'}
 
+        # 封面渲染和动图编码共用的进程池
+        self.ImagePool = ImagePool(max_workers=image_workers, max_tasks_per_child=image_tasks_per_worker)
+
         self.Pixiv = PixivTools(
             pixiv_user_id=pixiv_user_id, 
             save_path=save_path,
             headers=headers, 
             proxies=proxies,
+            pool_size=pool_size,
+            max_concurrent_requests=max_concurrent_requests,
+            download_workers=download_workers,
+            ugoira_format=ugoira_format,
+            rate_state_file_path=os.path.join(os.path.dirname(metadata_file_path), 'pixiv_rate.json'),
+            max_request_rate=max_request_rate,
+            image_pool=self.ImagePool,
+        )
+        self.Existence = ExistenceChecker(
+            pixiv=self.Pixiv,
+            max_workers=existence_workers,
+            max_checks_per_run=existence_checks_per_run,
         )
         self.Teleg = TelegramTools(
             bot=bot, 
             dustbin_id=dustbin_id, 
             temp_path=self.TEMP_PATH, 
             custom_api_server_url=custom_api_server_url,
+            file_id_cache_path=os.path.join(os.path.dirname(metadata_file_path), 'telegram_file_ids.json'),
+            local_mode=telegram_local_mode,
+            local_roots=[self.SAVE_PATH, self.TEMP_PATH],
+            message_store_path=os.path.join(os.path.dirname(metadata_file_path), 'messages.sqlite3'),
+            temp_space_limit=temp_space_limit,
+            image_pool=self.ImagePool,
         )
 
         # 日志
@@ -101,8 +153,17 @@ class Syncher:
             gap_time: float = 2.8, 
             max_tries: int = 5, 
             timeout: float = 30,
+            prefetch: int = 3,
+            pipeline_depth: int = 2,
         ):
-        #TODO: 增加收藏被主动移除的标记
+        '''
+        同步`[start_offset, end_offset)`范围内的收藏，从旧到新逐页处理。收藏列表由`self.Pixiv.crawlCollection`
+        在后台提前抓取，`pace`为每页的作品数（不超过接口允许的最大值）。
+
+        作品经过“下载 → 渲染封面 → 上传”流水线：上传第 k 个作品时，后面`pipeline_depth`个作品
+        （可能属于下一页）已在下载、渲染；每页处理完更新反馈消息。每个作品完成后立即保存；已同步过的作品下载了新版本、
+        尚未更新消息时，元数据中带有`syncStage`字段。
+        '''
 
         meta_dict, records_df = self.getMetaAndRecords()
         num_sync = end_offset - start_offset
@@ -115,34 +176,63 @@ class Syncher:
         
         progress = 0
         existence_dict = dict()
-        
-        for offset in range(end_offset-pace, start_offset-pace, -pace):
-            artwork_infos = self.Pixiv.getCollectionInfos(
-                tag='', offset=max(0,offset), limit=min(pace,pace+offset), 
-                rest='show', timeout=timeout)
-            artwork_infos.reverse()
-            # 获取起始作品的序号，用在起始反馈信息中
-            if not progress and artwork_infos:
-                if artwork_infos[0]['id'] not in records_df.index:
-                    if len(records_df) <= 0: first_artwork_syncno = 1
-                    else: first_artwork_syncno = records_df.iloc[-1]['syncNo'] + 1
-                else: first_artwork_syncno = records_df['syncNo'][artwork_infos[0]['id']]
-                feedback_text += f'\n起始序号：{first_artwork_syncno}'
-            
-            try:
-                for artwork in artwork_infos:
+        last_page = []
+        # 各页的作品连成一个序列，流水线在页与页之间不会排空
+        artwork_stream = ((page, artwork) for page in self.Pixiv.crawlCollection(
+                start_offset=start_offset, end_offset=end_offset, page_size=pace,
+                prefetch=prefetch, rest='show', timeout=timeout)
+            for artwork in page)
+
+        # 流水线：下载（含提前渲染封面）在后台线程中最多领先`pipeline_depth`个作品，
+        # 上传在当前线程中按顺序进行，保证同步序号和频道消息的顺序
+        pending = deque()
+        # 每个下载任务对应的作品，出错时据此报告是哪个作品
+        future_artworks: dict[Future, dict] = dict()
+        download_future = next_artwork = None
+        executor = ThreadPoolExecutor(max_workers=pipeline_depth + 1)
+        try:
+            while True:
+                try:
+                    # 补满流水线（取出当前作品后仍有`pipeline_depth`个在后台下载）：在当前线程中判断作品状态，
+                    # 后台只负责下载
+                    while len(pending) <= pipeline_depth and not stop_event.is_set():
+                        # 获取下一个作品时出错不能算到上一个作品上
+                        next_artwork = None
+                        next_page, next_artwork = next(artwork_stream, (None, None))
+                        if next_artwork is None: break
+                        if next_artwork['id'] not in records_df.index: next_status, next_old_artwork = 'New', None
+                        else: next_status, next_old_artwork = self.checkUpdateStatus(next_artwork, meta_dict)
+                        future = executor.submit(
+                            self.downloadStage, next_artwork, next_status, next_old_artwork, timeout)
+                        future_artworks[future] = next_artwork
+                        pending.append((next_page, next_status, next_old_artwork, future))
+                    if not pending: break
+                    page, status, old_artwork, download_future = pending.popleft()
+                    artwork = future_artworks[download_future]
+
                     # 中止信号处理：保存元数据和同步记录
                     if stop_event.is_set():
                         self.saveMetaAndRecords(meta_dict, records_df)
                         return curr_feedback_text, feedback_messages
 
+                    # 获取起始作品的序号，用在起始反馈信息中
+                    if not progress:
+                        if artwork['id'] not in records_df.index:
+                            if len(records_df) <= 0: first_artwork_syncno = 1
+                            else: first_artwork_syncno = records_df.iloc[-1]['syncNo'] + 1
+                        else: first_artwork_syncno = records_df['syncNo'][artwork['id']]
+                        feedback_text += f'\n起始序号：{first_artwork_syncno}'
+
                     # 如果作品没有被同步过，需要下载和上传，会记录当前作品存活状态
-                    if artwork['id'] not in records_df.index:
-                        # 确定此作品的同步序号
-                        syncno = records_df.iloc[-1]['syncNo'] + 1 if len(records_df) > 0 else 1
+                    if status == 'New':
                         # 下载新作品，如果作品404，version=0，否则version=1
                         (   artwork['pages'], artwork['existence'], artwork['version'], 
-                        ) = self.downloadNewArtwork(artwork, timeout)
+                            artwork['pageDigests'],
+                        ) = download_future.result()
+                        # 新作品没有下载检查点：上传前不写入元数据，否则上传失败后又被取消收藏时，
+                        # 这条没有同步记录的元数据永远不会被处理；下次同步会重新下载（内容相同的文件直接复用）
+                        # 确定此作品的同步序号
+                        syncno = records_df.iloc[-1]['syncNo'] + 1 if len(records_df) > 0 else 1
                         # 上传，无论作品是否404，都发送消息，404的消息封面即为pixiv的404页面图片
                         (   artwork['channelMessageId'], artwork['groupMessageId'], 
                             artwork['groupDocumentMessageIds'],
@@ -153,64 +243,88 @@ class Syncher:
                         meta_dict[str(artwork['id'])] = artwork
                         records_df.loc[artwork['id']] = pd.Series({
                             'syncNo': int(syncno), 'id': str(artwork['id']),
-                            'existence': bool(artwork['existence']),
+                            'existence': bool(artwork['existence']), 'bookmarked': True,
                         })
-                    
+                        self.saveArtwork(meta_dict, records_df, artwork['id'])
+                
                     # 如果作品被同步过，检查更新，不会更新存活状态
                     # BUG: 更新失败不能保存元数据
                     else:
-                        update_status, old_artwork = self.checkUpdateStatus(artwork, meta_dict)
                         syncno = records_df.at[artwork['id'], 'syncNo']
 
-                        match update_status:
+                        match status:
                             case 'UpdateMeta' | 'Reupload':
+                                # 等待下载阶段完成后才修改元数据（下载阶段会读取旧记录）
+                                download_result = download_future.result()
                                 # 更新元数据
                                 updated_artwork = old_artwork
                                 for key, val in artwork.items(): updated_artwork[key] = val
-                                # 更新作品文件（如果需要）
-                                if update_status == 'Reupload':
+                                # 更新作品文件（如果需要），只有内容变化的页会换成新文件
+                                changed_pages = None
+                                if status == 'Reupload':
                                     (   updated_artwork['pages'], updated_artwork['version'],
-                                    ) = self.downloadUpdatedArtwork(updated_artwork, timeout)
+                                        updated_artwork['pageDigests'], changed_pages,
+                                    ) = download_result
+                                    # 检查点：新版本已下载，消息尚未更新，中断后下次同步会重新上传
+                                    updated_artwork['syncStage'] = 'downloaded'
+                                    self.saveArtwork(meta_dict, records_df, artwork['id'])
                                 # 修改封面描述，并上传新文件（如果需要）
-                                time.sleep(gap_time)
                                 updated_artwork['groupDocumentMessageIds'] = self.updateArtworkMSG(
                                     syncno=syncno, artwork_info=updated_artwork, 
-                                    need_reupload=(update_status=='Reupload'), 
-                                    doc_uploading_gap_time=gap_time,
+                                    need_reupload=(status=='Reupload'), 
+                                    doc_uploading_gap_time=gap_time, changed_pages=changed_pages,
                                 )
                                 # 记录更新的作品元数据，不更新同步记录（即不更新存活状态）
+                                updated_artwork.pop('syncStage', None)
                                 meta_dict[str(updated_artwork['id'])] = updated_artwork
+                                if status == 'Reupload': self.saveArtwork(meta_dict, records_df, artwork['id'])
                             case 'NoUpdates': pass
-                            case _: raise NotImplementedError(f'没有实现 {update_status} 的功能。')
-                    
-                    # 记录当前作品存活状态
-                    existence_dict[artwork['id']] = (int(artwork['authorUserId']) > 0)
-                    progress += 1
-            
-                time.sleep(gap_time)
-            
-            except Exception as e:
-                self.saveMetaAndRecords(meta_dict, records_df)
-                raise RuntimeError(f"同步出错，当前作品：{artwork['id']}\n原始报错：{e}")
-            
-            # bot反馈
-            try:
-                for msg in feedback_messages:
-                    curr_feedback_text = feedback_text +\
-                        f"\n当前序号：{records_df['syncNo'][artwork_infos[-1]['id']]}" +\
-                        f"\n进度：{100 * progress / num_sync :.2f}%"
-                    autoRetry(self.bot.edit_message_text)(
-                        curr_feedback_text, msg.chat.id, msg.id, parse_mode='HTML')
-            except Exception as e:
-                raise RuntimeError(f"反馈消息更新出错，当前消息内容：{curr_feedback_text}\n原始报错：{e}")
-            # 保存元数据和同步记录
-            finally: self.saveMetaAndRecords(meta_dict, records_df)
+                            case _: raise NotImplementedError(f'没有实现 {status} 的功能。')
+
+                except Exception as e:
+                    self.saveMetaAndRecords(meta_dict, records_df)
+                    # 出错的是正在处理的作品；补满流水线时出错则是正在检查状态的作品
+                    failed_artwork = future_artworks.get(download_future, next_artwork)
+                    # 获取收藏列表出错
+                    if failed_artwork is None: raise
+                    raise RuntimeError(f"同步出错，当前作品：{failed_artwork['id']}\n原始报错：{e}")
+
+                # 记录当前作品存活状态
+                existence_dict[artwork['id']] = (int(artwork['authorUserId']) > 0)
+                progress += 1
+                del future_artworks[download_future]
+
+                # 一页作品处理完：bot反馈，保存元数据和同步记录
+                if artwork is page[-1]:
+                    last_page = page
+                    try:
+                        for msg in feedback_messages:
+                            curr_feedback_text = feedback_text +\
+                                f"\n当前序号：{records_df['syncNo'][artwork['id']]}" +\
+                                f"\n进度：{100 * progress / num_sync :.2f}%"
+                            autoRetry(self.bot.edit_message_text)(
+                                curr_feedback_text, msg.chat.id, msg.id, parse_mode='HTML')
+                    except Exception as e:
+                        raise RuntimeError(f"反馈消息更新出错，当前消息内容：{curr_feedback_text}\n原始报错：{e}")
+                    # 保存元数据和同步记录
+                    finally: self.saveMetaAndRecords(meta_dict, records_df)
+        # 未上传的作品不再下载，等待正在进行的下载结束
+        finally: executor.shutdown(wait=True, cancel_futures=True)
+        
+        # 同步到了最新的收藏，更新水位线：最后一页就是最新的收藏，旧水位线补在后面备用
+        if start_offset == 0 and last_page:
+            self.saveWatermark([artwork['id'] for artwork in reversed(last_page)])
         
+        # 标记被取消收藏的作品
+        meta_dict, records_df, curr_feedback_text = self.updateBookmarkStates(
+            feedback_text=curr_feedback_text, feedback_messages=feedback_messages,
+            meta_dict=meta_dict, records_df=records_df, prefetch=prefetch, timeout=timeout,
+        )
         # 更新作品存活状态
         meta_dict, records_df, curr_feedback_text = self.updateExistences(
             feedback_text=curr_feedback_text, feedback_messages=feedback_messages, 
             checked_existence_dict=existence_dict, 
-            meta_dict=meta_dict, records_df=records_df, gap_time=gap_time,
+            meta_dict=meta_dict, records_df=records_df,
         )
         # 保存元数据和同步记录
         self.saveMetaAndRecords(meta_dict, records_df)
@@ -218,6 +332,53 @@ class Syncher:
         return curr_feedback_text, feedback_messages
     
 
+    def countNewBookmarks(
+            self,
+            pace: int,
+            timeout: float = 30,
+        ) -> int | None:
+        '''
+        增量同步：从最新的收藏开始向后扫描，遇到水位线（上次同步完成时最新的几个收藏）中的任一作品即停止。
+
+        :return: 比水位线更新的收藏数量，即增量同步的`end_offset`；没有水位线，
+            或扫描到末尾仍未遇到水位线（水位线作品都被取消收藏）时返回`None`，需要完整同步。
+        :rtype: `int | None`
+        '''
+        watermark = set(self.getWatermark())
+        if not watermark: return None
+        offset = 0
+        while True:
+            artwork_infos = self.Pixiv.getCollectionInfos(
+                tag='', offset=offset, limit=pace, rest='show', timeout=timeout)
+            for idx, artwork in enumerate(artwork_infos):
+                if artwork['id'] in watermark: return offset + idx
+            if len(artwork_infos) < pace: return None
+            offset += pace
+    
+
+    def getWatermark(self) -> list[str]:
+        return loadJsonFile(self.SYNC_STATE_FILE_PATH, dict()).get('watermark', [])
+    
+
+    def saveWatermark(self, newest_ids: list[str]):
+        '''保存水位线：最新的收藏在前，旧水位线补在后面，以防最新的几个收藏之后被取消。'''
+        state = loadJsonFile(self.SYNC_STATE_FILE_PATH, dict())
+        watermark = list(dict.fromkeys(newest_ids + state.get('watermark', [])))
+        state['watermark'] = watermark[:self.WATERMARK_SIZE]
+        saveJsonFile(self.SYNC_STATE_FILE_PATH, state, indent=4)
+    
+
+    def getLastFullSyncAt(self) -> float | None:
+        ''':return: 上次完整同步成功结束的时间戳，从未完整同步过时返回`None`。'''
+        return loadJsonFile(self.SYNC_STATE_FILE_PATH, dict()).get('lastFullSyncAt')
+
+
+    def saveLastFullSyncAt(self, timestamp: float):
+        state = loadJsonFile(self.SYNC_STATE_FILE_PATH, dict())
+        state['lastFullSyncAt'] = timestamp
+        saveJsonFile(self.SYNC_STATE_FILE_PATH, state, indent=4)
+    
+
     def manuallyInputArtwork(
             self,
             artwork_info: dict,
@@ -258,6 +419,8 @@ class Syncher:
         # 补充referer和pageCount
         artwork_info['referer'] = f"https://www.pixiv.net/artworks/{artwork_info['id']}"
         artwork_info['pageCount'] = len(artwork_info['pages'])
+        # 手动输入的作品通常不在收藏中，标记后收藏状态比对会跳过它
+        artwork_info['manuallyInput'] = True
         # 上传，无论作品是否404，都发送消息，404的消息封面即为pixiv的404页面图片
         (   artwork_info['channelMessageId'], artwork_info['groupMessageId'], 
             artwork_info['groupDocumentMessageIds'],
@@ -268,7 +431,7 @@ class Syncher:
         meta_dict[str(artwork_info['id'])] = artwork_info
         records_df.loc[artwork_info['id']] = pd.Series({
             'syncNo': int(syncno), 'id': str(artwork_info['id']),
-            'existence': bool(artwork_info['existence']),
+            'existence': bool(artwork_info['existence']), 'bookmarked': True,
         })
         # 保存元数据和同步记录
         self.saveMetaAndRecords(meta_dict, records_df)
@@ -321,6 +484,8 @@ class Syncher:
                 updated_artwork_info[key] = old_artwork_info[key]
             else: updated_artwork_info[key] = new_artwork_info[key]
         updated_artwork_info['pageCount'] = len(updated_artwork_info['pages'])
+        # 手动给出的文件没有摘要信息，下次更新时所有页都重新下载
+        if 'pages' in new_artwork_info: updated_artwork_info.pop('pageDigests', None)
         # 更新作品频道消息，如有新文件则上传
         updated_artwork_info['groupDocumentMessageIds'] = self.updateArtworkMSG(
             syncno=syncno, artwork_info=updated_artwork_info, 
@@ -337,6 +502,49 @@ class Syncher:
         
     
 
+    def updateBookmarkStates(
+            self,
+            feedback_text: str,
+            feedback_messages: list[Message],
+            meta_dict: dict,
+            records_df: pd.DataFrame,
+            prefetch: int = 4,
+            timeout: float = 30,
+        ):
+        '''
+        标记被取消收藏的作品：只获取当前全部收藏的作品ID，与同步记录一次性比对，不需要逐个请求作品。
+        收藏状态改变（取消收藏或重新收藏）的作品会更新频道消息。
+        '''
+        bookmarked_ids = self.Pixiv.listCollectionIds(rest='show', max_workers=prefetch, timeout=timeout)
+        # 接口异常时可能返回空列表，此时不能把所有作品都标记为取消收藏
+        if not bookmarked_ids and len(records_df) > 0:
+            self.logger.warning("[收藏状态] 获取到的收藏列表为空，跳过本次比对。")
+            return meta_dict, records_df, feedback_text
+
+        # 手动输入的作品不参与比对，始终视为收藏中
+        manually_input = records_df['id'].map(
+            lambda illust_id: bool(meta_dict.get(str(illust_id), dict()).get('manuallyInput', False)))
+        bookmarked = records_df['id'].isin(bookmarked_ids) | manually_input
+        ids_to_update = list(records_df.index[bookmarked != records_df['bookmarked'].astype(bool)])
+        records_df['bookmarked'] = bookmarked
+
+        # 反馈消息
+        for msg in feedback_messages:
+            feedback_text += f'\n{len(ids_to_update)} 个作品收藏状态改变'
+            autoRetry(self.bot.edit_message_text)(
+                feedback_text, msg.chat.id, msg.id, parse_mode='HTML')
+
+        # 更新频道消息
+        for illust_id in ids_to_update:
+            meta_dict[str(illust_id)]['bookmarked'] = bool(records_df.at[illust_id, 'bookmarked'])
+            self.updateArtworkMSG(
+                records_df.at[illust_id, 'syncNo'], meta_dict[str(illust_id)],
+                need_reupload=False, doc_uploading_gap_time=0,
+            )
+        
+        return meta_dict, records_df, feedback_text
+    
+
     def updateExistences(
             self,
             feedback_text: str,
@@ -344,24 +552,32 @@ class Syncher:
             checked_existence_dict: dict[int, bool],
             meta_dict: dict,
             records_df: pd.DataFrame,
-            gap_time: float
         ):
         '''
-        更新作品存活状态。
+        更新作品存活状态。同步时扫描到的作品直接使用扫描结果，其余作品按检查层级挑选到期的一部分并发检查。
         '''
-        # 检查有哪些作品存活状态发生变化
+        now = datetime.now().astimezone()
+        checked_existence_dict = dict(checked_existence_dict)
+
+        # 挑选本次需要检查的作品，并发检查；已取消收藏的作品不再检查
+        unchecked_ids = list(records_df.index[
+            ~records_df.index.isin(list(checked_existence_dict)) & records_df['bookmarked'].astype(bool)])
+        due_ids = self.Existence.selectDueIds(unchecked_ids, meta_dict, now)
+        checked_existence_dict.update(
+            self.Existence.probe(due_ids, meta_dict=meta_dict))
+
+        # 检查有哪些作品存活状态发生变化，并记录检查时间
         ids_to_update = []
-        for illust_id, row in records_df.iterrows():
-            if illust_id not in checked_existence_dict:
-                if self.Pixiv.exists(illust_id) != row['existence']:
-                    ids_to_update.append(illust_id)
-                    time.sleep(gap_time)
-            elif checked_existence_dict[illust_id] != row['existence']:
-                ids_to_update.append(illust_id)
+        for illust_id, existence in checked_existence_dict.items():
+            if illust_id not in records_df.index: continue
+            changed = (existence != records_df.at[illust_id, 'existence'])
+            self.Existence.recordCheck(meta_dict[str(illust_id)], changed, now)
+            if changed: ids_to_update.append(illust_id)
         
         # 反馈消息
         for msg in feedback_messages:
-            feedback_text += f'\n{len(ids_to_update)} 个作品存活状态改变'
+            feedback_text += f'\n存活检查：{len(due_ids)}/{len(unchecked_ids)} 个到期作品' +\
+                f'\n{len(ids_to_update)} 个作品存活状态改变'
             autoRetry(self.bot.edit_message_text)(
                 feedback_text, msg.chat.id, msg.id, parse_mode='HTML')
         
@@ -380,7 +596,6 @@ class Syncher:
                     f"{'活了' if new_existence else '死了'}"
                 autoRetry(self.bot.edit_message_text)(
                     feedback_text, msg.chat.id, msg.id, parse_mode='HTML')
-            time.sleep(gap_time)
         
         return meta_dict, records_df, feedback_text
 
@@ -394,6 +609,8 @@ class Syncher:
         
         # 作品存活，检查需要更新什么
         if int(new_artwork_info['authorUserId']) > 0:
+            # 上次同步下载了新版本，但没有完成上传
+            if old_artwork.get('syncStage') == 'downloaded': return 'Reupload', old_artwork
             # 如果修改时间变动，则需要重新下载和上传图片文件，同时更新元数据
             if old_artwork['updateDate'] != new_artwork_info['updateDate']:
                 return 'Reupload', old_artwork
@@ -407,18 +624,64 @@ class Syncher:
         else: return 'NoUpdates', old_artwork
     
 
-    def downloadUpdatedArtwork(
+    def downloadStage(
             self,
             artwork_info: dict,
+            status: str,
+            old_artwork_info: dict | None,
             timeout: float,
         ):
+        '''
+        流水线的下载阶段（在后台线程中执行）：按作品状态下载新作品或新版本，然后在进程池中提前渲染封面。
+
+        :param status: `New`、`Reupload`、`UpdateMeta`或`NoUpdates`，后两者不需要下载。
+        :return: `New`时为`downloadNewArtwork`的返回值，`Reupload`时为`downloadUpdatedArtwork`的返回值，否则为`None`。
+        '''
+        if status == 'New':
+            result = self.downloadNewArtwork(artwork_info, timeout)
+            pages = result[0]
+            cover_path = os.path.join(self.SAVE_PATH, pages[0]) if pages else self.ERR404_PHOTO_FILE_PATH
+        elif status == 'Reupload':
+            # 不修改元数据中的旧记录，元数据只在上传阶段（当前线程）修改
+            result = self.downloadUpdatedArtwork({**old_artwork_info, **artwork_info}, timeout)
+            pages, changed_pages = result[0], result[3]
+            cover_path = os.path.join(self.SAVE_PATH, pages[0]) if pages and 0 in changed_pages else None
+        else: return None
+
+        # 渲染阶段：封面还没有 file_id 时提前渲染，上传时直接取用
+        if cover_path is not None:
+            cover_sha256 = sha256File(cover_path)
+            if self.Teleg.FileIds.get('photo', cover_sha256) is None:
+                self.Teleg.prerenderCover(cover_path, cover_sha256)
+        return result
+
+
+    def downloadUpdatedArtwork(
+            self,
+            artwork_info: dict,
+            timeout: float,
+        ) -> tuple[list[str], int, list[dict], list[int]]:
+        '''
+        下载作品的新版本。每页先用上一版本的摘要信息发送条件请求，内容未变的页继续使用旧文件。
+
+        :return: 新的文件名列表、版本号、每页摘要信息，以及内容有变化的页码列表。
+            没有任何页变化时，版本号保持不变。
+        :rtype: `tuple[list[str], int, list[dict], list[int]]`
+        '''
+        old_pages = artwork_info['pages']
         version = 1 + artwork_info['version']
-        pages = self.Pixiv.downloadArtwork(
+        pages, digests = self.Pixiv.downloadArtwork(
             illust_id=artwork_info['id'], version=version, 
             illust_type=artwork_info['illustType'],
             referer=artwork_info['referer'], timeout=timeout,
+            previous_pages=old_pages, previous_digests=artwork_info.get('pageDigests'),
         )
-        return pages, version
+        changed_pages = [idx for idx, page in enumerate(pages)
+            if idx >= len(old_pages) or page != old_pages[idx]]
+        if not changed_pages and len(pages) == len(old_pages): version = artwork_info['version']
+        self.logger.info(f"[同步] 作品 {artwork_info['id']} 共 {len(pages)} 页，" +\
+            f"其中 {len(changed_pages)} 页有变化。")
+        return pages, version, digests, changed_pages
     
 
     def updateArtworkMSG(
@@ -427,16 +690,28 @@ class Syncher:
             artwork_info: dict,
             need_reupload: bool,
             doc_uploading_gap_time: float = 2.8,
+            changed_pages: list[int] = None,
         ) -> list[int]:
         '''
         修改封面描述，根据情况决定是否重新上传。
-        
+
+        :param changed_pages: 内容有变化的页码（含新增的页），给出时只更新这些页：第 0 页变化才替换封面，
+            只发送变化和新增的页。没有每页的消息记录（`pageDocumentMessageIds`）时仍重新发送所有页。
         :return: 如果需要重新上传，则返回新文件的群组消息ID列表，否则返回旧列表。
         :rtype: `list[int]`
         '''
+        pages = artwork_info['pages']
+        page_digests = artwork_info.get('pageDigests') or []
+        page_msg_ids = artwork_info.get('pageDocumentMessageIds')
+        if changed_pages is None or not page_msg_ids:
+            changed_pages = list(range(len(pages)))
+            page_msg_ids = [[] for _ in pages]
+        else:
+            # 页数变化：新增的页补上空记录，删掉的页不再记录
+            page_msg_ids = (list(page_msg_ids) + [[] for _ in pages])[:len(pages)]
         # 更新封面
         try:
-            if need_reupload:
+            if need_reupload and 0 in changed_pages:
                 cover_path = os.path.join(self.SAVE_PATH, artwork_info['pages'][0])
             else: cover_path = None
             self.Teleg.updatePhoto(
@@ -454,13 +729,13 @@ class Syncher:
 
         # 重新上传图片文件
         if need_reupload:
-            group_document_msg_ids = []
-            for page in artwork_info['pages']:
+            for idx in changed_pages:
                 try:
-                    group_document_msg_ids += self.Teleg.sendFile(
-                        file_path=os.path.join(self.SAVE_PATH, page),
+                    page_msg_ids[idx] = self.Teleg.sendFile(
+                        file_path=os.path.join(self.SAVE_PATH, pages[idx]),
                         chat_id=self.GROUP_ID, reply_to_msg_id=artwork_info['groupMessageId'],
                         gap_time_for_sending_zip_volumes=doc_uploading_gap_time,
+                        sha256=(page_digests[idx] or dict()).get('sha256') if idx < len(page_digests) else None,
                     )
                 except Exception as e:
                     raise MessageSendingFailed(
@@ -469,8 +744,8 @@ class Syncher:
                         f"消息id ({artwork_info['channelMessageId']})。"
                         f"\n原始报错：{e}"
                     )
-                time.sleep(doc_uploading_gap_time)
-            return group_document_msg_ids
+            artwork_info['pageDocumentMessageIds'] = page_msg_ids
+            return [msg_id for msg_ids in page_msg_ids for msg_id in msg_ids]
         else: return artwork_info['groupDocumentMessageIds']
 
 
@@ -482,11 +757,12 @@ class Syncher:
         # 如果作品404
         if int(artwork_info['authorUserId']) <= 0:
             pages = []
+            digests = []
             existence = False
             version = 0
         # 如果作品存活
         else:
-            pages = self.Pixiv.downloadArtwork(
+            pages, digests = self.Pixiv.downloadArtwork(
                 illust_id=artwork_info['id'], version=1, 
                 illust_type=artwork_info['illustType'],
                 referer=artwork_info['referer'], timeout=timeout,
@@ -494,7 +770,7 @@ class Syncher:
             existence = True
             version = 1
         # 返回值
-        return pages, existence, version
+        return pages, existence, version, digests
 
 
     def uploadNewArtwork(
@@ -528,19 +804,21 @@ class Syncher:
         self.bot.unpin_all_chat_messages(self.GROUP_ID)
         # 发送作品文件
         try:
-            group_document_msg_ids = []
+            page_msg_ids = []
             for page in pages:
-                group_document_msg_ids += self.Teleg.sendFile(
+                page_msg_ids.append(self.Teleg.sendFile(
                     file_path=os.path.join(self.SAVE_PATH, page),
                     chat_id=self.GROUP_ID, reply_to_msg_id=group_cover_msg_id,
                     gap_time_for_sending_zip_volumes=gap_time,
-                )
-                time.sleep(gap_time)
+                ))
         except Exception as e:
             # 删除封面
             autoRetry(self.bot.delete_message)(self.CHANNEL_ID, channel_cover_msg_id)
             raise e
         
+        # 记录每页对应的消息，更新作品时只需重新发送变化的页
+        artwork_info['pageDocumentMessageIds'] = page_msg_ids
+        group_document_msg_ids = [msg_id for msg_ids in page_msg_ids for msg_id in msg_ids]
         return channel_cover_msg_id, group_cover_msg_id, group_document_msg_ids
 
 
@@ -550,7 +828,7 @@ class Syncher:
             authorScreenName: str, authorUserId: int,
             bookmarkTags: list[str], tags: list[str],
             pageCount: int, referer: str, existence: bool,
-            createDate: str, updateDate: str,
+            createDate: str, updateDate: str, bookmarked: bool = True,
             *args, **kwargs,
         ):
         createDate = datetime.fromisoformat(createDate)
@@ -559,7 +837,8 @@ class Syncher:
             f"序号：#SYNC_{syncno}\n" +\
             f"收藏标签：{escape('#'+' #'.join(bookmarkTags))}\n\n" +\
             f"标题：{escape(str(title))}\n" +\
-            f"作品ID：<code>{id}</code>{' (#ERR404)' if not existence else ''}\n" +\
+            f"作品ID：<code>{id}</code>{' (#ERR404)' if not existence else ''}" +\
+            f"{' (#UNBOOKMARKED)' if not bookmarked else ''}\n" +\
             f"作者：{escape(str(authorScreenName))}\n" +\
             f"作者ID：<code>{authorUserId}</code>\n\n" +\
             f"页数：{pageCount}    链接：<a href=\"{referer}\">PIXIV</a>    " +\
@@ -571,25 +850,30 @@ class Syncher:
 
 
     def getMetaAndRecords(self):
-        # 元数据
-        if os.path.exists(self.METADATA_FILE_PATH):
-            with open(self.METADATA_FILE_PATH, 'rt') as f:
-                meta_dict: dict[str, dict] = json.load(f)
-        else: meta_dict: dict[str, dict] = dict()
-        # 同步记录
-        if os.path.exists(self.RECORDS_FILE_PATH):
-            records_df = pd.read_csv(self.RECORDS_FILE_PATH,
-                dtype={'syncNo': int, 'id': str, 'existence': bool})
-            records_df.index = records_df['id']
-        else: records_df = pd.DataFrame(columns=['syncNo', 'id', 'existence'])
-        # 返回
+        '''
+        从元数据存储中读取全部作品的元数据和同步记录，结构与原 metadata.json / records.csv 相同。
+        旧版本留下的、带有`syncStage`但没有同步记录的新作品检查点会被删除。
+        '''
+        meta_dict, records_df = self.Meta.load()
+        orphan_ids = [illust_id for illust_id, meta in meta_dict.items()
+            if 'syncStage' in meta and illust_id not in records_df.index]
+        if orphan_ids:
+            self.Meta.removeArtworks(orphan_ids)
+            for illust_id in orphan_ids: meta_dict.pop(illust_id)
+            self.logger.info(f"[元数据存储] 已删除 {len(orphan_ids)} 个未完成上传的新作品检查点。")
         return meta_dict, records_df
 
 
     def saveMetaAndRecords(self, meta_dict: dict, records_df: pd.DataFrame):
-        with open(self.METADATA_FILE_PATH, 'w') as f:
-            json.dump(meta_dict, f, ensure_ascii=False, indent=4, separators=(',', ': '))
-        records_df.to_csv(self.RECORDS_FILE_PATH, index=False)
+        '''只写入与上次读取、保存相比有变化的作品。'''
+        self.Meta.save(meta_dict, records_df)
+
+
+    def saveArtwork(self, meta_dict: dict, records_df: pd.DataFrame, illust_id: str):
+        '''流水线检查点：在一个事务中只写入一个作品的元数据和同步记录。'''
+        record = tuple(records_df.loc[illust_id, ['syncNo', 'id', 'existence', 'bookmarked']]) \
+            if illust_id in records_df.index else None
+        self.Meta.saveArtwork(illust_id, meta_dict.get(str(illust_id)), record)
     
 
     def isArtworkRecorded(self, artwork_id):
@@ -7,7 +7,6 @@ import tomlkit
 import schedule
 import threading
 
-from math import ceil
 from threading import Event
 from datetime import datetime
 from telebot import TeleBot, types
@@ -45,7 +44,7 @@ class Tasks:
         ...
     }
     ```
-    - 同步记录表的列：`'syncNo', 'id', 'existence'`
+    - 同步记录表的列：`'syncNo', 'id', 'existence', 'bookmarked'`
     '''
     def __init__(
             self,
@@ -64,6 +63,17 @@ class Tasks:
             headers: dict,
             proxies: dict = None,
             timezone: str = "Asia/Shanghai",
+            pool_size: int = 10,
+            max_concurrent_requests: int = 4,
+            download_workers: int = 4,
+            ugoira_format: str = 'gif',
+            existence_workers: int = 4,
+            existence_checks_per_run: int = 500,
+            max_request_rate: float = 20,
+            telegram_local_mode: bool = False,
+            temp_space_limit: int = 10 * 1000 ** 3,
+            image_workers: int = 2,
+            image_tasks_per_worker: int = 20,
         ):
         self.bot = bot
 
@@ -86,6 +96,17 @@ class Tasks:
             temp_path = temp_path,
             headers = headers,
             proxies = proxies,
+            pool_size = pool_size,
+            max_concurrent_requests = max_concurrent_requests,
+            download_workers = download_workers,
+            ugoira_format = ugoira_format,
+            existence_workers = existence_workers,
+            existence_checks_per_run = existence_checks_per_run,
+            max_request_rate = max_request_rate,
+            telegram_local_mode = telegram_local_mode,
+            temp_space_limit = temp_space_limit,
+            image_workers = image_workers,
+            image_tasks_per_worker = image_tasks_per_worker,
         )
         self.Pixiv = self.Syncher.Pixiv
         self.Teleg = self.Syncher.Teleg
@@ -95,11 +116,17 @@ class Tasks:
         self.event_stop_scheduled_tasks = threading.Event()
         self.event_stop_manual_tasks = threading.Event()
 
-        # 设置并启动定时任务：包括定时同步任务和定时清理任务
+        # 设置并启动定时任务：包括每周增量同步、每四周完整同步和定时清理任务
+        # 完整同步的时间记录在同步状态中，每天检查是否到期，重启进程不会推迟完整同步
+        self.FULL_SYNC_INTERVAL = 28 * 86400
         schedule.every().monday.at("09:30", pytz.timezone(timezone)).do(
             self.syncOnSchedule, allowed_telegram_users)
+        schedule.every().day.at("03:30", pytz.timezone(timezone)).do(
+            self.fullSyncIfOverdue, allowed_telegram_users)
         schedule.every().day.at("09:00", pytz.timezone(timezone)).do(
             self.removeOutDatedFiles, self.SAVE_PATH, 86400)
+        schedule.every().day.at("09:10", pytz.timezone(timezone)).do(
+            self.removeOutDatedFiles, self.Teleg.COVER_PATH, 7 * 86400)
         self.thread_scheduled_tasks = threading.Thread(
             target=self.runSchedule, args=(self.event_stop_scheduled_tasks,))
         self.thread_scheduled_tasks.start()
@@ -131,12 +158,12 @@ class Tasks:
         self.thread_scheduled_tasks.start()
     
 
-    def startTriggeredSync(self, feedback_chat_ids: list[int|str]):
+    def startTriggeredSync(self, feedback_chat_ids: list[int|str], full: bool = False):
         # 停止所有任务
         self.stopAllTasks()
         # 启动触发同步任务
         self.thread_triggered_synchronizing = threading.Thread(
-            target=self.syncByTriggered, args=(feedback_chat_ids,))
+            target=self.syncByTriggered, args=(feedback_chat_ids, full))
         self.thread_triggered_synchronizing.start()
         # 恢复定时任务
         self.startScheduledTasks()
@@ -148,7 +175,7 @@ class Tasks:
             time.sleep(1)
     
 
-    def syncOnSchedule(self, feedback_chat_ids: list[int|str]):
+    def syncOnSchedule(self, feedback_chat_ids: list[int|str], full: bool = False):
         # 防止与触发同步任务冲突
         if self.is_synchronizing_by_triggered:
             for chat_id in feedback_chat_ids:
@@ -156,47 +183,94 @@ class Tasks:
                     chat_id, '已取消本次同步任务，因为当前有触发同步任务。')
             return False
         # 开始同步
-        self.logger.info("[定时同步] 启动定时同步任务。")
+        self.logger.info(f"[定时同步] 启动定时{'完整' if full else '增量'}同步任务。")
         logIfError(self.logger, self.syncTask)(
-            self.event_stop_scheduled_tasks, feedback_chat_ids)
+            self.event_stop_scheduled_tasks, feedback_chat_ids, full)
         self.logger.info("[定时同步] 定时同步任务完成。")
     
 
+    def fullSyncIfOverdue(self, feedback_chat_ids: list[int|str]):
+        '''距上次完整同步成功结束超过`self.FULL_SYNC_INTERVAL`（或从未完整同步过）时，启动定时完整同步。'''
+        last_full_sync_at = self.Syncher.getLastFullSyncAt()
+        if last_full_sync_at is not None and time.time() - last_full_sync_at < self.FULL_SYNC_INTERVAL: return
+        self.syncOnSchedule(feedback_chat_ids, True)
+
+
     def removeOutDatedFiles(self, dir: str, time2live: float, stop_event: Event = None):
+        '''
+        清理过期文件。本地存储中的文件按加入存储的时间判断是否过期（硬链接的 ctime 会随链接数变化），
+        并通过存储删除，最后一个引用被删除时才删除内容。
+        '''
         self.logger.info(f"[清理过期文件] 正在清理目录 \"{dir}\" 下创建时间大于 {time2live}s 的文件。")
+        store = self.Pixiv.Store
+        is_store_root = os.path.abspath(dir) == store.ROOT
         now = time.time()
         out_dated_time = now - time2live
         # 遍历文件夹中的所有文件
-        for filename in os.listdir(dir):
-            file_path = os.path.join(dir, filename)
-            if stop_event and stop_event.is_set(): return
-            # 判断是否是文件（排除子文件夹）
-            if os.path.isfile(file_path):
-                # 获取文件的最后修改时间
-                file_ctime = os.path.getctime(file_path)
-                # 如果文件修改时间早于过期时间，则删除
-                if file_ctime < out_dated_time: os.remove(file_path)
+        try:
+            for filename in os.listdir(dir):
+                file_path = os.path.join(dir, filename)
+                if stop_event and stop_event.is_set(): return
+                # 判断是否是文件（排除子文件夹）
+                if os.path.isfile(file_path):
+                    if is_store_root and store.isManaged(filename):
+                        if store.getAddedAt(filename) < out_dated_time: store.remove(filename)
+                        continue
+                    # 获取文件的最后修改时间
+                    file_ctime = os.path.getctime(file_path)
+                    # 如果文件修改时间早于过期时间，则删除
+                    if file_ctime < out_dated_time: os.remove(file_path)
+        # 一轮清理只写入一次存储清单
+        finally:
+            if is_store_root: store.save()
+        if is_store_root:
+            freed = store.prune()
+            stats = store.getStats()
+            self.logger.info(f"[清理过期文件] 本地存储：{stats['files']} 个文件，" +\
+                f"{stats['blobs']} 份内容，共 {stats['bytes'] / 1e6:.2f} MB，" +\
+                f"另清理无引用的内容 {freed / 1e6:.2f} MB。")
         self.logger.info(f"[清理过期文件] 目录 \"{dir}\" 清理完成。")
     
 
-    def syncByTriggered(self, feedback_chat_ids: list[int|str]):
+    def syncByTriggered(self, feedback_chat_ids: list[int|str], full: bool = False):
         self.is_synchronizing_by_triggered = True
-        self.logger.info("[触发式同步] 启动触发式同步任务。")
+        self.logger.info(f"[触发式同步] 启动触发式{'完整' if full else '增量'}同步任务。")
         logIfError(self.logger, self.syncTask)(
-            self.event_stop_triggered_synchronizing, feedback_chat_ids)
+            self.event_stop_triggered_synchronizing, feedback_chat_ids, full)
         self.logger.info("[触发式同步] 触发式同步任务完成。")
         self.is_synchronizing_by_triggered = False
     
 
-    def syncTask(self, stop_event: Event, feedback_chat_ids: list[int|str]):
-        # 确定步长，通过步长控制步数为50步左右，如果50步不能完成，则最大步长为50
+    def syncTask(self, stop_event: Event, feedback_chat_ids: list[int|str], full: bool = False):
+        '''
+        :param full: 完整同步：扫描全部收藏，检查所有作品的更新。否则为增量同步：
+            只同步比水位线更新的收藏，没有水位线时退回完整同步。
+        '''
         num_collections = self.Pixiv.countCollection()
-        pace = max(min(ceil(num_collections / 50), 50), 1)
+        if not full:
+            num_new = self.Syncher.countNewBookmarks(pace=self.Pixiv.MAX_PAGE_SIZE)
+            if num_new is None:
+                self.logger.info("[增量同步] 找不到水位线，改为完整同步。")
+                full = True
+            else: num_collections = num_new
+        # 每页取接口允许的最大作品数，作品较少时一页取完
+        pace = max(min(num_collections, self.Pixiv.MAX_PAGE_SIZE), 1)
         # 开始同步
         feedback_text, feedback_messages = self.Syncher.autoSync(
             feedback_chat_ids = feedback_chat_ids, stop_event = stop_event,
             start_offset = 0, end_offset = num_collections, pace = pace,
         )
+        # 完整同步成功结束（未被中止），记录时间，定时完整同步据此判断是否到期
+        if full and not stop_event.is_set():
+            self.Syncher.saveLastFullSyncAt(time.time())
+            self.logger.info("[完整同步] 已记录本次完整同步的完成时间。")
+        # 保存学到的 Pixiv 请求速率，下次同步从这里开始
+        self.Pixiv.Governor.save()
+        self.logger.info(f"[速率调节] 本次同步结束时 Pixiv 请求速率 {self.Pixiv.Governor.rate:.2f} 次/秒。")
+        # 记录 Pixiv 连接复用情况
+        for host, stats in self.Pixiv.getConnectionStats().items():
+            self.logger.info(f"[连接复用] {host}：请求 {stats['requests']} 次，" +\
+                f"新建连接 {stats['connections']} 个，复用 {stats['reused']} 次。")
         # 完成同步
         for msg in feedback_messages:
             autoRetry(self.bot.edit_message_text)(
@@ -383,9 +457,10 @@ class Tasks:
                 if self.manual_artwork_info['illustType'] == 2:
                     file_stem = f"{artwork_id}_v{version}"
                 else: file_stem = f"{artwork_id}_p{part_no}_v{version}"
-                self.manual_artwork_info['pages'].append(
-                    self.Teleg.downloadFile(message, self.SAVE_PATH, file_stem)
-                )
+                file_name = self.Teleg.downloadFile(message, self.SAVE_PATH, file_stem)
+                self.Pixiv.Store.add(file_name)
+                self.Pixiv.Store.save()
+                self.manual_artwork_info['pages'].append(file_name)
             except Exception as e:
                 self.logger.error(f"[手动输入作品] 原图下载失败：{artwork_id}_p{part_no}")
                 autoRetry(self.bot.send_message)(message.chat.id, "❗原图下载失败，此次输入取消。")
@@ -561,10 +636,11 @@ class Tasks:
             else: is_gif = (self.manual_artwork_info['illustType'] == 2)
 
             try:
-                self.manual_artwork_info['pages'].append(
-                    self.Teleg.downloadFile(message, self.SAVE_PATH,
+                file_name = self.Teleg.downloadFile(message, self.SAVE_PATH,
                     f"{artwork_id}_v{version}" if is_gif else f"{artwork_id}_p{part_no}_v{version}")
-                )
+                self.Pixiv.Store.add(file_name)
+                self.Pixiv.Store.save()
+                self.manual_artwork_info['pages'].append(file_name)
             except Exception as e:
                 self.logger.error(f"[手动修改作品] 原图下载失败：{artwork_id}_p{part_no}")
                 autoRetry(self.bot.send_message)(message.chat.id, "❗原图下载失败，此次修改取消。")
@@ -1,14 +1,24 @@
 import os
 import re
 import time
-import shutil
 import logging
+import threading
 
-from PIL import Image, ImageFile, ImageSequence
-from telebot import TeleBot, apihelper
-from telebot.types import Message, InputMediaPhoto
+from typing import Callable
+from contextlib import ExitStack
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from PIL import Image, ImageFile
+from telebot import TeleBot, apihelper, util
+from telebot.types import Message, InputMediaPhoto, MessageOriginChannel
 
-from .utils import autoRetry, MessageNotFound
+from .utils import autoRetry, sha256File, MessageNotFound
+from .cover import renderCover
+from .workspace import TempSpace
+from .workers import ImagePool
+from .volumes import countVolumes, volumeName, writeVolume
+from .fileids import FileIdCache
+from .messages import MessageStore
 
 
 
@@ -17,6 +27,47 @@ ImageFile.LOAD_TRUNCATED_IMAGES = True
 
 
 
+class AutoForwardMap:
+    '''
+    记录频道消息自动转发到讨论群组后的消息ID：Bot 收到群组中的自动转发消息（`is_automatic_forward`）时登记，
+    发送频道消息的线程等待登记结果，不需要额外的 API 调用。
+    '''
+    def __init__(self, max_size: int = 1000):
+        self.MAX_SIZE = max_size
+        # (频道ID, 频道消息ID) -> 群组消息ID
+        self.forwards: OrderedDict[tuple[str, int], int] = OrderedDict()
+        # 收到过自动转发消息的群组
+        self.active_group_ids: set[str] = set()
+        self.condition = threading.Condition()
+
+
+    def record(self, message: Message):
+        # 转发来源在`forward_origin`中（`forward_from_chat`等字段已弃用），频道消息的来源为`MessageOriginChannel`
+        origin = message.forward_origin
+        if not message.is_automatic_forward or not isinstance(origin, MessageOriginChannel): return
+        key = (str(origin.chat.id), origin.message_id)
+        with self.condition:
+            self.forwards[key] = message.id
+            self.forwards.move_to_end(key)
+            while len(self.forwards) > self.MAX_SIZE: self.forwards.popitem(last=False)
+            self.active_group_ids.add(str(message.chat.id))
+            self.condition.notify_all()
+
+
+    def isActive(self, group_id: int | str) -> bool:
+        '''本次运行中是否已经收到过该群组的自动转发消息，即 Bot 能否收到这些更新。'''
+        return str(group_id) in self.active_group_ids
+
+
+    def wait(self, channel_id: int | str, channel_msg_id: int, timeout: float) -> int | None:
+        '''等待频道消息的自动转发，超时返回`None`。'''
+        key = (str(channel_id), channel_msg_id)
+        with self.condition:
+            self.condition.wait_for(lambda: key in self.forwards, timeout=timeout)
+            return self.forwards.get(key)
+
+
+
 class TelegramTools:
     def __init__(
             self,
@@ -24,8 +75,39 @@ class TelegramTools:
             dustbin_id: int,
             temp_path: str,
             custom_api_server_url: str = None,
+            file_id_cache_path: str = None,
+            local_mode: bool = False,
+            local_server_data_path: str = '/var/lib/telegram-bot-api',
+            local_roots: list[str] = None,
+            message_store_path: str = None,
+            temp_space_limit: int = 10 * 1000 ** 3,
+            image_pool: ImagePool = None,
         ):
+        '''
+        :param file_id_cache_path: file_id 缓存文件，为空时不持久化，只在本次运行内复用。
+        :param local_mode: 自定义 API 服务器以`--local`模式运行，并且能以相同的绝对路径读到
+            `save_path`和`temp_path`时，上传只传`file://`路径，由服务器直接读取文件。
+        :param local_server_data_path: 本地模式下 API 服务器保存文件的目录，下载文件时据此换算路径。
+        :param local_roots: 本地模式下 API 服务器能以相同绝对路径读到的目录，默认只有`temp_path`；
+            其他位置的文件（例如 404 封面图）仍通过 HTTP 上传。
+        :param message_store_path: 消息存储的 SQLite 数据库文件，为空时只保存在内存中。
+        :param temp_space_limit: 所有临时工作区（渲染封面、大文件分卷）合计占用的字节数上限。
+        :param image_pool: 渲染封面的进程池，为空时在调用线程中渲染。
+        '''
         self.bot = bot
+        self.FileIds = FileIdCache(file_id_cache_path)
+
+        # 记录 Bot 发送和修改的所有消息（需要 bot 为 ScheduledBot）
+        self.Messages = MessageStore(message_store_path or ':memory:')
+        if hasattr(self.bot, 'addObserver'): self.bot.addObserver(self.Messages.observe)
+
+        # 从更新中登记频道消息到讨论群组的自动转发
+        self.AutoForwards = AutoForwardMap()
+        def onAutoForward(message: Message):
+            self.AutoForwards.record(message)
+            self.Messages.record(message)
+        self.bot.register_message_handler(onAutoForward,
+            content_types=util.content_type_media, func=lambda msg: bool(msg.is_automatic_forward))
 
         self.DUSTBIN_ID = dustbin_id
         self.TEMP_PATH = temp_path
@@ -34,18 +116,32 @@ class TelegramTools:
         self.MAX_PHOTO_FILE_SIZE = 8 * 1000 * 1000
 
         if not os.path.exists(temp_path): os.mkdir(temp_path)
+        # 渲染好的封面按原图 SHA-256 缓存
+        self.COVER_PATH = os.path.join(temp_path, 'covers')
+        os.makedirs(self.COVER_PATH, exist_ok=True)
+        # 每个任务独立的临时工作区
+        self.TempSpace = TempSpace(temp_path, temp_space_limit)
+        # 封面在进程池中渲染，记录正在渲染的封面，避免重复提交
+        self.ImagePool = image_pool if image_pool is not None else ImagePool(max_workers=0)
+        self.cover_jobs: dict[str, Future] = dict()
+        self.cover_lock = threading.Lock()
+
+        # 日志
+        self.logger = logging.getLogger('Pixar2Tele')
 
         # 使用自定义 API 服务器
         if isinstance(custom_api_server_url, str) and custom_api_server_url:
             apihelper.API_URL = os.path.join(custom_api_server_url, "bot{0}/{1}")
             apihelper.FILE_URL = os.path.join(custom_api_server_url, "file/bot{0}/{1}")
             self.MAX_DOCUMENT_SIZE = 2000 * 1000 * 1000
+            self.LOCAL_MODE = local_mode
         # 使用官方 API 服务器
         else:
             self.MAX_DOCUMENT_SIZE = 50 * 1000 * 1000
-        
-        # 日志
-        self.logger = logging.getLogger('Pixar2Tele')
+            self.LOCAL_MODE = False
+            if local_mode: self.logger.warning("[本地模式] 未设置自定义 API 服务器，本地模式不生效。")
+        self.LOCAL_SERVER_DATA_PATH = local_server_data_path
+        self.LOCAL_ROOTS = [os.path.realpath(root) for root in (local_roots or [temp_path])]
     
 
     def updatePhoto(
@@ -59,10 +155,9 @@ class TelegramTools:
         '''
         如果`photo_path`为空，则保留原图，只更新`caption`。
         '''
-        def editMessagePhoto(bot: TeleBot, chat_id, message_id, photo_path, caption, parse_mode):
-            with open(photo_path, 'rb') as photo:
-                media = InputMediaPhoto(photo, caption, parse_mode)
-                bot.edit_message_media(media, chat_id, message_id)
+        def editMessagePhoto(photo):
+            media = InputMediaPhoto(photo, caption, parse_mode)
+            return self.bot.edit_message_media(media, chat_id, message_id)
 
         if photo_path is None:
             try: autoRetry(self.bot.edit_message_caption)(
@@ -70,14 +165,9 @@ class TelegramTools:
             except Exception as e:
                 self.logger.error(f"图片描述更新失败，图片描述：\n{caption}\n报错：{e}")
         else:
-            file_ext = os.path.splitext(photo_path)[1]
-            resized_path = os.path.join(self.TEMP_PATH, f'temp{file_ext}')
-            photo_path = self.resizePicture(
-                input_path=photo_path, resized_path=resized_path,
-                to_file_size=self.MAX_PHOTO_FILE_SIZE, to_photo_dim=self.MAX_PHOTO_DIM,
-            )
-            try: autoRetry(editMessagePhoto, base_delay=2.8)(
-                self.bot, chat_id, message_id, photo_path, caption, parse_mode)
+            photo_sha256 = sha256File(photo_path)
+            try: autoRetry(self.sendByFileId, base_delay=2.8, endpoint='telegram')(
+                'photo', photo_sha256, editMessagePhoto, lambda: self.preparePhoto(photo_path, photo_sha256))
             except Exception as e:
                 self.logger.error(f"带图消息更新失败，图片描述：\n{caption}\n报错：{e}")
 
@@ -94,54 +184,72 @@ class TelegramTools:
         ) -> tuple[int, int] | int:
         '''
         返回频道消息ID，和对应的群组消息ID（如果有）。
+
+        群组消息ID优先从 Bot 收到的自动转发更新中取得；超时（例如 Bot 收不到群组消息）时，
+        退回到逐个转发群组消息查找的方式。
         '''
-        def sendPhoto(bot: TeleBot, chat_id, photo_path, caption, parse_mode):
-            with open(photo_path, 'rb') as photo:
-                return bot.send_photo(chat_id, photo, caption, parse_mode)
+        def sendPhoto(photo):
+            return self.bot.send_photo(channel_id, photo, caption, parse_mode)
         
-        file_ext = os.path.splitext(photo_path)[1]
-        resized_path = os.path.join(self.TEMP_PATH, f'temp{file_ext}')
-        photo_path = self.resizePicture(
-            input_path=photo_path, resized_path=resized_path,
-            to_file_size=self.MAX_PHOTO_FILE_SIZE, to_photo_dim=self.MAX_PHOTO_DIM,
-        )
+        photo_sha256 = sha256File(photo_path)
+        # 需要上传时提前在进程池中渲染封面，与下面发送测试消息同时进行
+        if self.FileIds.get('photo', photo_sha256) is None: self.prerenderCover(photo_path, photo_sha256)
         
-        if chat_group_id is not None:
-            # 发送测试消息，获取讨论群在发送封面前的最新message_id
+        # 还没收到过自动转发更新时，发送测试消息，获取讨论群在发送封面前的最新message_id，供查找时使用
+        events_active = chat_group_id is not None and self.AutoForwards.isActive(chat_group_id)
+        group_msg_id_before_photo = None
+        if chat_group_id is not None and not events_active:
             group_msg_before_photo = autoRetry(self.bot.send_message)(chat_group_id, '.')
             autoRetry(self.bot.delete_message)(chat_group_id, group_msg_before_photo.id)
+            group_msg_id_before_photo = group_msg_before_photo.id
         
         # 发送封面，此后报错将需要立刻删除频道消息
-        channel_msg = autoRetry(sendPhoto, base_delay=retry_gap_time)(
-            self.bot, channel_id, photo_path, caption, parse_mode)
+        channel_msg = autoRetry(self.sendByFileId, base_delay=retry_gap_time, endpoint='telegram')(
+            'photo', photo_sha256, sendPhoto, lambda: self.preparePhoto(photo_path, photo_sha256))
 
         # 如果有讨论群组
         if chat_group_id is None: return channel_msg.id
 
+        # 等待自动转发更新
+        wait_time = retry_gap_time * max_tries if events_active else retry_gap_time
+        group_cover_msg_id = self.AutoForwards.wait(channel_id, channel_msg.id, timeout=wait_time)
+        if group_cover_msg_id is not None: return channel_msg.id, group_cover_msg_id
+        self.logger.info(f"[自动转发] 未收到频道消息 {channel_msg.id} 的自动转发更新，改为逐个查找群组消息。")
+
         # 找出与频道消息对应的讨论组消息，最多尝试max_tries次寻找消息
-        else:
-            try:
-                for _ in range(max_tries):
-                    time.sleep(retry_gap_time)
-                    for id in range(group_msg_before_photo.id + 1, group_msg_before_photo.id + 5):
-                        try:
-                            msg = self.getMessageContent(chat_group_id, id, max_tries=2)
-                            if (str(msg.forward_from_chat.id) == str(channel_id) 
-                                and msg.forward_from_message_id == channel_msg.id):
-                                group_cover_msg_id = id
-                                break
-                        except: pass
-                    else: continue
-                    break
-                else: raise MessageNotFound(f"频道消息id为 {channel_msg.id}，无法找到群组中的对应消息。")
-            
-            except Exception as e:
-                # 删除频道消息
-                autoRetry(self.bot.delete_message)(channel_id, channel_msg.id)
-                # 重新报错
-                raise e
+        try:
+            if group_msg_id_before_photo is not None:
+                candidate_ids = range(group_msg_id_before_photo + 1, group_msg_id_before_photo + 5)
+            else:
+                # 没有发送前的测试消息：自动转发此时应已在群组中，从最新的消息往前找
+                group_msg_after_photo = autoRetry(self.bot.send_message)(chat_group_id, '.')
+                autoRetry(self.bot.delete_message)(chat_group_id, group_msg_after_photo.id)
+                candidate_ids = range(group_msg_after_photo.id - 1, group_msg_after_photo.id - 5, -1)
+            for _ in range(max_tries):
+                time.sleep(retry_gap_time)
+                # 查找期间自动转发更新可能已经到达
+                group_cover_msg_id = self.AutoForwards.wait(channel_id, channel_msg.id, timeout=0)
+                if group_cover_msg_id is not None: break
+                for id in candidate_ids:
+                    try:
+                        msg = self.getMessageContent(chat_group_id, id, max_tries=2)
+                        origin = msg.forward_origin
+                        if (isinstance(origin, MessageOriginChannel) and str(origin.chat.id) == str(channel_id)
+                            and origin.message_id == channel_msg.id):
+                            group_cover_msg_id = id
+                            break
+                    except: pass
+                else: continue
+                break
+            else: raise MessageNotFound(f"频道消息id为 {channel_msg.id}，无法找到群组中的对应消息。")
+        
+        except Exception as e:
+            # 删除频道消息
+            autoRetry(self.bot.delete_message)(channel_id, channel_msg.id)
+            # 重新报错
+            raise e
 
-            return channel_msg.id, group_cover_msg_id
+        return channel_msg.id, group_cover_msg_id
     
 
     def sendFile(
@@ -150,41 +258,152 @@ class TelegramTools:
             chat_id: int,
             reply_to_msg_id: int = None,
             gap_time_for_sending_zip_volumes: float = 2.8,
+            sha256: str = None,
         ) -> list[int]:
         '''
-        返回消息ID列表，文件过大时会发送压缩分卷，所以可能不止一条消息。
+        返回消息ID列表，文件过大时按字节切成分卷发送（见`volumes.py`，不压缩），所以可能不止一条消息；
+        每个分卷的说明文字中附有合并命令，例如`cat 文件名.001 文件名.002 > 文件名`。
+
+        :param sha256: 文件内容的 SHA-256。本地文件已被清理时，用它从 file_id 缓存中找到上传过的文件重新发送。
         '''
-        def sendDocument(bot: TeleBot, chat_id, file_path, reply_to_msg_id):
-            with open(file_path, 'rb') as file:
-                return bot.send_document(chat_id, file, reply_to_msg_id)
-        
-        # 如果文件过大，需要分卷压缩再上传
-        if os.stat(file_path).st_size >= self.MAX_DOCUMENT_SIZE:
-            msg_ids = []
-
-            zip_path = os.path.join(self.TEMP_PATH, 'zip')
-            zip_file_path = os.path.join(zip_path, f'{os.path.basename(file_path)}.zip')
-            os.system(f'zip -r -s {self.MAX_DOCUMENT_SIZE//(1024**2)}M {zip_file_path} {file_path}')
-
-            # 上传分卷
-            for filename in os.listdir(zip_path):
-                volume_path = os.path.join(zip_path, filename)
-                msg: Message = autoRetry(sendDocument, base_delay=gap_time_for_sending_zip_volumes)(
-                    self.bot, chat_id, volume_path, reply_to_msg_id)
-                msg_ids.append(msg.id)
-                time.sleep(gap_time_for_sending_zip_volumes)
-            
-            # 移除本地压缩包
-            shutil.rmtree(zip_path)
-
-            return msg_ids
+        def sendDocument(file_path, sha256=None, caption=None):
+            return autoRetry(self.sendByFileId, base_delay=gap_time_for_sending_zip_volumes,
+                endpoint='telegram')(
+                'document', sha256 or sha256File(file_path),
+                lambda document: self.bot.send_document(chat_id, document, reply_to_msg_id, caption=caption),
+                lambda: file_path,
+            )
         
-        # 小文件则直接上传
-        else:
-            msg: Message = autoRetry(sendDocument)(self.bot, chat_id, file_path, reply_to_msg_id)
-            return [msg.id]
+        # 本地文件已被清理：只能用缓存的 file_id 发送
+        if not os.path.exists(file_path):
+            if sha256 is None or self.FileIds.get('document', sha256) is None:
+                raise FileNotFoundError(f"文件 \"{file_path}\" 已被清理，且没有可用的 file_id。")
+            return [sendDocument(file_path, sha256).id]
+
+        # 小文件直接上传
+        file_size = os.stat(file_path).st_size
+        if file_size <= self.MAX_DOCUMENT_SIZE: return [sendDocument(file_path).id]
+
+        # 大文件逐个生成分卷：上传当前分卷的同时写下一个分卷，临时目录中最多同时有两个分卷
+        num_volumes = countVolumes(file_size, self.MAX_DOCUMENT_SIZE)
+        file_name = os.path.basename(file_path)
+        volume_names = [volumeName(file_name, index) for index in range(num_volumes)]
+        join_hint = f"合并：cat {' '.join(volume_names)} > {file_name}\n" +\
+            f"Windows：copy /b {'+'.join(volume_names)} {file_name}"
+        msg_ids = []
+        with self.TempSpace.workspace(2 * self.MAX_DOCUMENT_SIZE, prefix='split-') as split_path, \
+        ThreadPoolExecutor(max_workers=1) as executor:
+            def produceVolume(index):
+                volume_path = os.path.join(split_path, volumeName(file_name, index))
+                return volume_path, writeVolume(file_path, volume_path, index, self.MAX_DOCUMENT_SIZE)
+
+            next_volume = executor.submit(produceVolume, 0)
+            for index in range(num_volumes):
+                volume_path, volume_sha256 = next_volume.result()
+                if index + 1 < num_volumes: next_volume = executor.submit(produceVolume, index + 1)
+                msg_ids.append(sendDocument(volume_path, volume_sha256,
+                    caption=f"分卷 {index + 1}/{num_volumes}\n{join_hint}").id)
+                os.remove(volume_path)
+        self.logger.info(f"[分卷上传] 文件 \"{file_name}\" 已分为 {num_volumes} 卷上传。")
+        return msg_ids
     
 
+    def sendByFileId(
+            self,
+            kind: str,
+            sha256: str,
+            send: Callable,
+            prepare: Callable[[], str],
+        ) -> Message:
+        '''
+        内容已上传过时直接用缓存的 file_id 发送，否则上传文件并记录 file_id。
+
+        :param kind: `photo`或`document`。
+        :param send: 接收 file_id 或已打开的文件，发送并返回消息。
+        :param prepare: 缓存未命中时才调用，返回要上传的文件路径（例如压缩后的封面）。
+        '''
+        file_id = self.FileIds.get(kind, sha256)
+        if file_id is not None:
+            try: return send(file_id)
+            except apihelper.ApiTelegramException as e:
+                # file_id 失效时改为上传文件，其他错误交给重试策略
+                if e.error_code != 400 or 'file' not in e.description.lower(): raise
+                self.logger.info(f"[file_id 缓存] 缓存的 file_id 已失效，重新上传：{e.description}")
+                self.FileIds.discard(kind, sha256)
+
+        upload_path = prepare()
+        # 本地模式：服务器直接从共享目录读取文件，不经过 HTTP 上传
+        if self.isLocallyReadable(upload_path): msg = send(f'file://{os.path.abspath(upload_path)}')
+        else:
+            with open(upload_path, 'rb') as file: msg = send(file)
+        if isinstance(msg, Message):
+            if kind == 'photo' and msg.photo: self.FileIds.put(kind, sha256, msg.photo[-1].file_id)
+            elif kind == 'document' and msg.document: self.FileIds.put(kind, sha256, msg.document.file_id)
+        return msg
+
+
+    def preparePhoto(self, photo_path: str, sha256: str = None) -> str:
+        '''返回要作为照片上传的路径，需要渲染封面时等待渲染完成。'''
+        return self.prerenderCover(photo_path, sha256).result()
+
+
+    def prerenderCover(self, photo_path: str, sha256: str = None) -> Future:
+        '''
+        在进程池中渲染封面，立即返回`Future`，结果为要作为照片上传的路径。已在限制内的静态图直接上传原图，
+        否则渲染为 JPEG 封面。封面按原图的 SHA-256 缓存在`<临时目录>/covers`中，更新消息、重试时不再重复渲染；
+        同一张图正在渲染时返回同一个`Future`。
+        '''
+        file_ext = os.path.splitext(photo_path)[1].lower()
+        if file_ext != '.mp4' and os.stat(photo_path).st_size <= self.MAX_PHOTO_FILE_SIZE:
+            with Image.open(photo_path) as img:
+                if not getattr(img, 'is_animated', False) and max(img.size) <= self.MAX_PHOTO_DIM \
+                and img.format in ('JPEG', 'PNG'): return self.doneFuture(photo_path)
+
+        if sha256 is None: sha256 = sha256File(photo_path)
+        cover_path = os.path.join(self.COVER_PATH, f'{sha256}.jpg')
+        with self.cover_lock:
+            if sha256 in self.cover_jobs: return self.cover_jobs[sha256]
+            if os.path.exists(cover_path): return self.doneFuture(cover_path)
+            cover_future = self.cover_jobs[sha256] = Future()
+
+        # 在独立的工作区中渲染，再原子地移入缓存。工作区由 ExitStack 管理：提交成功后转交给渲染完成的回调关闭，
+        # 提交之前出错时在这里关闭
+        def onRendered(render_future: Future, stack: ExitStack):
+            with stack:
+                try:
+                    os.replace(render_future.result(), cover_path)
+                    cover_future.set_result(cover_path)
+                except Exception as e: cover_future.set_exception(e)
+                finally:
+                    with self.cover_lock: self.cover_jobs.pop(sha256, None)
+        try:
+            with ExitStack() as stack:
+                work_path = stack.enter_context(
+                    self.TempSpace.workspace(self.MAX_PHOTO_FILE_SIZE, prefix='cover-'))
+                render_future = self.ImagePool.submit(renderCover, photo_path,
+                    os.path.join(work_path, 'cover.jpg'), self.MAX_PHOTO_DIM, self.MAX_PHOTO_FILE_SIZE)
+                callback_stack = stack.pop_all()
+        except Exception as e:
+            with self.cover_lock: self.cover_jobs.pop(sha256, None)
+            cover_future.set_exception(e)
+            return cover_future
+        render_future.add_done_callback(lambda future: onRendered(future, callback_stack))
+        return cover_future
+
+
+    def isLocallyReadable(self, file_path: str) -> bool:
+        '''本地模式下，文件是否在 API 服务器挂载的目录中。'''
+        if not self.LOCAL_MODE: return False
+        real_path = os.path.realpath(file_path)
+        return any(os.path.commonpath([real_path, root]) == root for root in self.LOCAL_ROOTS)
+
+
+    def doneFuture(self, result) -> Future:
+        future = Future()
+        future.set_result(result)
+        return future
+
+
     def downloadFile(
             self,
             message: Message,
@@ -193,9 +412,18 @@ class TelegramTools:
         ):
         file_info = self.bot.get_file(message.document.file_id)
         file_name = f"{file_stem}{os.path.splitext(message.document.file_name)[-1]}"
-        downloaded_file = self.bot.download_file(file_info.file_path)
-        with open(os.path.join(save_path, file_name), 'wb') as new_file:
+        # 服务器以 --local 模式运行时 file_path 是服务器上的绝对路径 <数据目录>/<token>/<相对路径>，
+        # 换算为下载用的相对路径；与是否开启本地模式上传无关
+        remote_path = file_info.file_path
+        if os.path.isabs(remote_path):
+            remote_path = self.replacePrefix(
+                remote_path, re.escape(self.LOCAL_SERVER_DATA_PATH.rstrip('/')) + r'/[^/]+/', '')
+        downloaded_file = self.bot.download_file(remote_path)
+        # 同名文件可能是本地存储中的硬链接，先写入临时文件再替换，不能原地覆盖
+        file_path = os.path.join(save_path, file_name)
+        with open(f'{file_path}.part', 'wb') as new_file:
             new_file.write(downloaded_file)
+        os.replace(f'{file_path}.part', file_path)
         return file_name
 
 
@@ -205,52 +433,6 @@ class TelegramTools:
         return pattern.sub(new_prefix, s, count=1)
 
 
-    def resizePicture(
-            self,
-            input_path: str, 
-            resized_path: str, 
-            to_file_size: int, 
-            to_photo_dim: int,
-        ):
-        '''
-        调整图片大小和图片文件大小。支持静态图和 GIF（仅处理第一帧作为封面）。
-
-        :param input_path: 原始图片路径
-        :param resized_path: 输出图片路径
-        :param to_file_size: 封面图目标文件大小（字节）
-        :param to_photo_dim: 最大边长限制（像素）
-        :return: 返回封面图路径（如果无需压缩则返回原路径）
-        '''
-        img = Image.open(input_path)
-
-        # 如果是 GIF，提取第一帧作为封面图
-        if img.format == 'GIF':
-            img = next(ImageSequence.Iterator(img)).convert('RGB')  # 转为 RGB 以便保存为静态图像
-            if not resized_path.lower().endswith(('.jpg', '.jpeg', '.png')):
-                resized_path += '.jpg'  # 默认保存为 JPEG
-            input_path = resized_path
-            img.save(input_path)
-        
-        origin_filesize = os.stat(input_path).st_size
-
-        # 计算压缩比例
-        rate = 1
-        if origin_filesize and origin_filesize > to_file_size:
-            rate = (to_file_size / origin_filesize) ** 0.5
-
-        max_dim = max(img.size)
-        if max_dim > to_photo_dim:
-            rate = min(rate, to_photo_dim / max_dim)
-
-        # 开始压缩
-        if rate != 1:
-            new_size = (int(img.size[0] * rate), int(img.size[1] * rate))
-            new_img = img.resize(new_size, Image.LANCZOS)
-            new_img.save(resized_path)
-            return resized_path
-        else: return input_path
-    
-    
     def appendText2Message(
             self, 
             text: str, 
@@ -258,11 +440,11 @@ class TelegramTools:
             message_id: str | int, 
             parse_mode='HTML',
         ):
-        '''编辑消息：将文本补充到消息末尾。'''
-        msg = autoRetry(self.bot.forward_message)(self.DUSTBIN_ID, chat_id, message_id)
+        '''编辑消息：将文本补充到消息末尾。消息内容优先从消息存储中读取。'''
+        html_text = self.Messages.getHtmlText(chat_id, message_id)
+        if html_text is None: html_text = self.getMessageContent(chat_id, message_id).html_text
         autoRetry(self.bot.edit_message_text)(
-            msg.html_text + text, chat_id, message_id, parse_mode=parse_mode)
-        autoRetry(self.bot.delete_message)(self.DUSTBIN_ID, msg.id)
+            html_text + text, chat_id, message_id, parse_mode=parse_mode)
     
     
     def getMessageContent(
@@ -271,6 +453,11 @@ class TelegramTools:
             message_id: str | int,
             max_tries = 5,
         ) -> Message:
+        '''
+        读取消息内容：优先从消息存储中读取；没有记录时，把消息转发到垃圾桶聊天读取后再删除。
+        '''
+        msg = self.Messages.get(chat_id, message_id)
+        if msg is not None: return msg
         msg = autoRetry(self.bot.forward_message, max_tries=max_tries)(self.DUSTBIN_ID, chat_id, message_id)
         autoRetry(self.bot.delete_message, max_tries=max_tries)(self.DUSTBIN_ID, msg.id)
         return msg
@@ -0,0 +1,309 @@
+'''
+动图（ugoira）的流式解码与编码：逐帧从 zip 中读取并送入编码器，内存中只保留当前帧。
+
+支持的输出格式：
+- `gif`：所有帧共用一个全局调色板（从整段动图中抽样生成），每帧只做调色板映射，不再逐帧量化。
+- `webp`：逐帧编码为静态 WebP，再写入动画 WebP 的帧块。
+- `apng`：逐帧写入 APNG 分块。
+- `mp4`：通过 imageio-ffmpeg 自带的 ffmpeg 编码为 H.264。
+'''
+
+import io
+import zlib
+import struct
+import zipfile
+
+from math import gcd
+from functools import reduce
+from typing import Iterator
+from PIL import Image, GifImagePlugin
+
+
+UGOIRA_FORMATS = {'gif': '.gif', 'webp': '.webp', 'apng': '.png', 'mp4': '.mp4'}
+
+
+
+class GifStreamWriter:
+    '''
+    逐帧写入 GIF 文件，写完一帧即可释放该帧，不需要在内存中保留全部帧。
+
+    如果给出`palette`，所有帧都映射到这个全局调色板；否则第一帧的调色板作为全局调色板，
+    之后每帧单独量化并带上局部调色板。
+    '''
+    def __init__(self, file_path: str, loop: int = 0, palette: Image.Image = None):
+        self.file = open(file_path, 'wb')
+        self.loop = loop
+        self.palette = palette
+        self.num_frames = 0
+
+
+    def append(self, image: Image.Image, duration: int):
+        '''
+        :param image: 当前帧。
+        :param duration: 当前帧的显示时长（毫秒）。
+        '''
+        if self.palette is not None:
+            frame = image.convert('RGB').quantize(palette=self.palette)
+        else: frame = image.convert('RGB').quantize(colors=256)
+
+        if self.num_frames == 0:
+            header, _ = GifImagePlugin.getheader(frame, info={'loop': self.loop, 'duration': duration})
+            for chunk in header: self.file.write(chunk)
+            params = {'duration': duration}
+        elif self.palette is not None:
+            params = {'duration': duration}
+        else:
+            params = {'duration': duration, 'include_color_table': True}
+        for chunk in GifImagePlugin.getdata(frame, **params): self.file.write(chunk)
+        self.num_frames += 1
+
+
+    def close(self):
+        # GIF 结束符
+        if self.num_frames: self.file.write(b';')
+        self.file.close()
+
+
+    def __enter__(self): return self
+    def __exit__(self, *exc_info): self.close()
+
+
+
+class ApngStreamWriter:
+    '''
+    逐帧写入 APNG 文件。每帧先用 Pillow 编码为 PNG，再把其中的 IDAT 数据改写为 APNG 的帧数据块。
+    '''
+    PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+    def __init__(self, file_path: str, num_frames: int, loop: int = 0):
+        self.file = open(file_path, 'wb')
+        self.total_frames = num_frames
+        self.loop = loop
+        self.num_frames = 0
+        self.sequence = 0
+
+
+    def writeChunk(self, chunk_type: bytes, data: bytes):
+        self.file.write(struct.pack('>I', len(data)) + chunk_type + data)
+        self.file.write(struct.pack('>I', zlib.crc32(chunk_type + data) & 0xffffffff))
+
+
+    def append(self, image: Image.Image, duration: int):
+        '''
+        :param image: 当前帧，所有帧的尺寸必须相同。
+        :param duration: 当前帧的显示时长（毫秒）。
+        '''
+        buffer = io.BytesIO()
+        image.convert('RGB').save(buffer, format='PNG', compress_level=6)
+        png = buffer.getvalue()
+
+        # 拆分 PNG 分块
+        ihdr, idat = b'', []
+        offset = len(self.PNG_SIGNATURE)
+        while offset < len(png):
+            length, chunk_type = struct.unpack('>I4s', png[offset:offset+8])
+            data = png[offset+8:offset+8+length]
+            if chunk_type == b'IHDR': ihdr = data
+            elif chunk_type == b'IDAT': idat.append(data)
+            offset += 12 + length
+        width, height = struct.unpack('>II', ihdr[:8])
+
+        if self.num_frames == 0:
+            self.file.write(self.PNG_SIGNATURE)
+            self.writeChunk(b'IHDR', ihdr)
+            self.writeChunk(b'acTL', struct.pack('>II', self.total_frames, self.loop))
+
+        # 帧控制块：尺寸、偏移、时长（duration/1000 秒）、不处理上一帧、直接覆盖
+        self.writeChunk(b'fcTL', struct.pack('>IIIIIHHBB',
+            self.sequence, width, height, 0, 0, duration, 1000, 0, 0))
+        self.sequence += 1
+
+        # 第一帧同时是默认图像，使用 IDAT；之后的帧使用 fdAT
+        for data in idat:
+            if self.num_frames == 0: self.writeChunk(b'IDAT', data)
+            else:
+                self.writeChunk(b'fdAT', struct.pack('>I', self.sequence) + data)
+                self.sequence += 1
+        self.num_frames += 1
+
+
+    def close(self):
+        if self.num_frames: self.writeChunk(b'IEND', b'')
+        self.file.close()
+
+
+    def __enter__(self): return self
+    def __exit__(self, *exc_info): self.close()
+
+
+
+class WebpStreamWriter:
+    '''
+    逐帧写入动画 WebP 文件。每帧先用 Pillow 编码为静态 WebP，再把其中的图像数据块（VP8 / VP8L）
+    包装为动画帧块（ANMF）。RIFF 头中的文件大小在关闭时回填。
+    '''
+    def __init__(self, file_path: str, loop: int = 0, quality: int = 90, method: int = 4):
+        self.file = open(file_path, 'wb')
+        self.loop = loop
+        self.quality = quality
+        self.method = method
+        self.num_frames = 0
+
+
+    def writeChunk(self, chunk_type: bytes, data: bytes):
+        self.file.write(chunk_type + struct.pack('<I', len(data)) + data)
+        # 奇数长度的块补一个字节
+        if len(data) % 2: self.file.write(b'\x00')
+
+
+    def append(self, image: Image.Image, duration: int):
+        '''
+        :param image: 当前帧。
+        :param duration: 当前帧的显示时长（毫秒）。
+        '''
+        buffer = io.BytesIO()
+        image.convert('RGB').save(buffer, format='WEBP', quality=self.quality, method=self.method)
+        webp = buffer.getvalue()
+
+        # 取出图像数据块，连同补齐字节原样放入帧块
+        frame_data = b''
+        offset = 12
+        while offset < len(webp):
+            chunk_type, length = struct.unpack('<4sI', webp[offset:offset+8])
+            padded_length = length + length % 2
+            if chunk_type in (b'VP8 ', b'VP8L'): frame_data += webp[offset:offset+8+padded_length]
+            offset += 8 + padded_length
+
+        width, height = image.size
+        if self.num_frames == 0:
+            # RIFF 头中的文件大小先写占位，关闭时回填
+            self.file.write(b'RIFF\x00\x00\x00\x00WEBP')
+            # 标志位：动画（0x02）；画布尺寸取第一帧的尺寸（-1），24 位小端整数
+            self.writeChunk(b'VP8X', bytes([0x02, 0, 0, 0])
+                + (width - 1).to_bytes(3, 'little') + (height - 1).to_bytes(3, 'little'))
+            # 背景色（BGRA）、循环次数
+            self.writeChunk(b'ANIM', struct.pack('<IH', 0, self.loop))
+
+        # 帧块：偏移（/2）、宽高（-1）、时长，均为 24 位小端整数；标志位：不混合、不处理上一帧
+        header = b''.join(value.to_bytes(3, 'little')
+            for value in (0, 0, width - 1, height - 1, min(duration, 0xffffff))) + b'\x02'
+        self.writeChunk(b'ANMF', header + frame_data)
+        self.num_frames += 1
+
+
+    def close(self):
+        if self.num_frames:
+            file_size = self.file.tell()
+            self.file.seek(4)
+            self.file.write(struct.pack('<I', file_size - 8))
+        self.file.close()
+
+
+    def __enter__(self): return self
+    def __exit__(self, *exc_info): self.close()
+
+
+
+def decodeFrame(zip_ref: zipfile.ZipFile, file_name: str) -> Image.Image:
+    '''从已打开的动图 zip 中解码一帧。'''
+    with zip_ref.open(file_name) as member:
+        image = Image.open(io.BytesIO(member.read()))
+        image.load()
+    return image
+
+
+def iterUgoiraFrames(zip_path: str, frames: list[dict]) -> Iterator[tuple[Image.Image, int]]:
+    '''
+    按`frames`的顺序逐帧从动图 zip 中解码，不解压到磁盘。
+
+    :param frames: ugoira_meta 中的帧列表，`[{"file": <帧文件名>, "delay": <毫秒>}, ...]`
+    :return: 依次产出`(帧图像, 显示时长毫秒)`。
+    '''
+    with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+        for frame in frames:
+            yield decodeFrame(zip_ref, frame['file']), int(frame['delay'])
+
+
+def buildSharedPalette(
+        zip_path: str,
+        frames: list[dict],
+        num_samples: int = 8,
+        sample_dim: int = 256,
+    ) -> Image.Image:
+    '''
+    从整段动图中均匀抽取`num_samples`帧，缩小后拼接，量化出所有帧共用的 256 色调色板。
+
+    :return: 带调色板的`P`模式图像，可直接传给`Image.quantize(palette=...)`。
+    '''
+    step = max(len(frames) / num_samples, 1)
+    sample_indexes = sorted({int(i * step) for i in range(min(num_samples, len(frames)))})
+
+    samples = []
+    with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+        for idx in sample_indexes:
+            image = decodeFrame(zip_ref, frames[idx]['file']).convert('RGB')
+            image.thumbnail((sample_dim, sample_dim))
+            samples.append(image)
+
+    mosaic = Image.new('RGB', (max(s.width for s in samples), sum(s.height for s in samples)))
+    top = 0
+    for sample in samples:
+        mosaic.paste(sample, (0, top))
+        top += sample.height
+    return mosaic.quantize(colors=256)
+
+
+def readVideoFirstFrame(file_path: str) -> Image.Image:
+    '''读取视频（MP4 格式的动图）的第一帧。'''
+    import imageio.v2 as imageio
+    reader = imageio.get_reader(file_path, format='FFMPEG')
+    try: return Image.fromarray(reader.get_data(0))
+    finally: reader.close()
+
+
+def encodeUgoira(
+        zip_path: str,
+        frames: list[dict],
+        output_path: str,
+        output_format: str = 'gif',
+        quality: int = 90,
+    ):
+    '''
+    将动图 zip 编码为指定格式。
+
+    :param output_format: `gif`、`webp`、`apng`或`mp4`，见`UGOIRA_FORMATS`。
+    :param quality: WebP 和 MP4 的画质（0-100）。
+    '''
+    match output_format:
+        case 'gif':
+            palette = buildSharedPalette(zip_path, frames)
+            with GifStreamWriter(output_path, palette=palette) as writer:
+                for image, delay in iterUgoiraFrames(zip_path, frames):
+                    writer.append(image, delay)
+
+        case 'webp':
+            with WebpStreamWriter(output_path, quality=quality) as writer:
+                for image, delay in iterUgoiraFrames(zip_path, frames):
+                    writer.append(image, delay)
+
+        case 'apng':
+            with ApngStreamWriter(output_path, num_frames=len(frames)) as writer:
+                for image, delay in iterUgoiraFrames(zip_path, frames):
+                    writer.append(image, delay)
+
+        case 'mp4':
+            import numpy as np
+            import imageio.v2 as imageio
+            # MP4 只支持固定帧率：取各帧时长的最大公约数作为帧间隔（不超过 60fps），长帧重复写入
+            delays = [max(int(frame['delay']), 1) for frame in frames]
+            interval = max(reduce(gcd, delays), 1000 // 60)
+            writer = imageio.get_writer(output_path, format='FFMPEG', mode='I',
+                fps=1000 / interval, codec='libx264', quality=quality / 10,
+                pixelformat='yuv420p', macro_block_size=2)
+            try:
+                for image, delay in iterUgoiraFrames(zip_path, frames):
+                    data = np.asarray(image.convert('RGB'))
+                    for _ in range(max(round(delay / interval), 1)): writer.append_data(data)
+            finally: writer.close()
+
+        case _: raise ValueError(f"不支持的动图格式 {output_format}，仅支持 {', '.join(UGOIRA_FORMATS)}。")
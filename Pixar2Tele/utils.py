@@ -1,12 +1,19 @@
 import os
 import time
+import json
 import pytz
+import random
+import hashlib
 import logging
 import telebot
+import requests
+import threading
 import traceback
 
-from datetime import datetime
+from datetime import datetime, timezone
 from typing import Callable
+from telebot import apihelper
+from email.utils import parsedate_to_datetime
 from logging.handlers import RotatingFileHandler
 
 
@@ -17,6 +24,193 @@ class MessageNotFound(Exception):
 class MessageSendingFailed(Exception):
     '''消息发送失败'''
 
+# 下载报错
+class DownloadIncomplete(Exception):
+    '''下载的文件不完整'''
+
+# 重试报错
+class CircuitOpen(Exception):
+    '''接口熔断中，暂停调用'''
+
+# 错误类型
+RETRYABLE = 'retryable'
+RATE_LIMITED = 'rate_limited'
+FATAL = 'fatal'
+
+
+
+class RetryBudget:
+    '''
+    每个接口的重试预算（令牌桶）：每次重试消耗 1 个令牌，每次成功返还`token_ratio`个令牌。
+    令牌少于一半时不再重试，避免接口持续出错时重试把请求量放大数倍。
+    '''
+    def __init__(self, max_tokens: float = 100, token_ratio: float = 0.1):
+        self.MAX_TOKENS = max_tokens
+        self.TOKEN_RATIO = token_ratio
+        self.tokens = max_tokens
+        self.lock = threading.Lock()
+
+    def onSuccess(self):
+        with self.lock: self.tokens = min(self.tokens + self.TOKEN_RATIO, self.MAX_TOKENS)
+
+    def tryAcquire(self) -> bool:
+        with self.lock:
+            if self.tokens < self.MAX_TOKENS / 2: return False
+            self.tokens -= 1
+            return True
+
+
+
+class CircuitBreaker:
+    '''
+    熔断器：接口连续`failure_threshold`次出现可重试的错误（连接失败、超时、5xx）后断开，
+    `cooldown`秒内的调用直接报`CircuitOpen`；冷却结束后放行一次试探调用，成功则恢复。
+    '''
+    def __init__(self, name: str, failure_threshold: int = 10, cooldown: float = 60):
+        self.NAME = name
+        self.FAILURE_THRESHOLD = failure_threshold
+        self.COOLDOWN = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+        self.lock = threading.Lock()
+        self.logger = logging.getLogger('Pixar2Tele')
+
+    def before(self) -> bool:
+        ''':return: 本次调用是否为冷却结束后的试探调用。'''
+        with self.lock:
+            if self.opened_at is None: return False
+            remaining = self.opened_at + self.COOLDOWN - time.monotonic()
+            if remaining > 0 or self.probing:
+                raise CircuitOpen(f"接口 {self.NAME} 暂时不可用，{max(remaining, 0):.0f} 秒后再试。")
+            # 冷却结束，只放行一次试探调用
+            self.probing = True
+            return True
+
+    def releaseProbe(self):
+        '''试探调用没有得出接口是否可用的结论（例如本地参数错误）时，允许下一次调用继续试探。'''
+        with self.lock: self.probing = False
+
+    def onSuccess(self):
+        with self.lock:
+            if self.opened_at is not None:
+                self.logger.info(f"[重试] 接口 {self.NAME} 已恢复。")
+            self.failures = 0
+            self.opened_at = None
+            self.probing = False
+
+    def onFailure(self):
+        with self.lock:
+            self.failures += 1
+            if self.probing or (self.opened_at is None and self.failures >= self.FAILURE_THRESHOLD):
+                self.logger.warning(f"[重试] 接口 {self.NAME} 连续 {self.failures} 次出错，" +\
+                    f"暂停调用 {self.COOLDOWN} 秒。")
+                self.opened_at = time.monotonic()
+            self.probing = False
+
+
+
+class RetryPolicy:
+    '''
+    按错误类型重试：
+    - `fatal`（404、鉴权失败等）：不重试，直接报错；
+    - `rate_limited`（429）：按服务器给出的`Retry-After`/`retry_after`等待后重试；
+    - `retryable`（连接失败、超时、5xx 等）：指数退避加随机抖动后重试。
+
+    同一接口（`endpoint`）的所有调用共用一个重试预算和一个熔断器。
+    '''
+    ENDPOINTS: dict[str, tuple[RetryBudget, CircuitBreaker]] = dict()
+    ENDPOINTS_LOCK = threading.Lock()
+
+    def __init__(
+            self,
+            endpoint: str = 'default',
+            max_tries: int = 5,
+            base_delay: float = 1,
+            backoff_factor: float = 2.0,
+            max_delay: float = 60,
+        ):
+        self.ENDPOINT = endpoint
+        self.MAX_TRIES = max_tries
+        self.BASE_DELAY = base_delay
+        self.BACKOFF_FACTOR = backoff_factor
+        self.MAX_DELAY = max_delay
+        self.budget, self.breaker = self.getEndpointGuards(endpoint)
+
+
+    @classmethod
+    def getEndpointGuards(cls, endpoint: str) -> tuple[RetryBudget, CircuitBreaker]:
+        with cls.ENDPOINTS_LOCK:
+            if endpoint not in cls.ENDPOINTS:
+                cls.ENDPOINTS[endpoint] = (RetryBudget(), CircuitBreaker(endpoint))
+            return cls.ENDPOINTS[endpoint]
+
+
+    def call(self, func: Callable, *args, **kwargs):
+        delay = self.BASE_DELAY
+        for attempt in range(self.MAX_TRIES):
+            is_probe = self.breaker.before()
+            try:
+                feedback = func(*args, **kwargs)
+            except Exception as e:
+                kind, retry_after = classifyError(e)
+                if kind == RETRYABLE: self.breaker.onFailure()
+                # 限流、404 等服务器给出的回应都说明接口可用，不计入熔断
+                elif kind == RATE_LIMITED or isinstance(e, (apihelper.ApiTelegramException,
+                apihelper.ApiHTTPException, requests.HTTPError)): self.breaker.onSuccess()
+                if (kind == FATAL or attempt >= self.MAX_TRIES - 1
+                or not self.budget.tryAcquire()): raise
+                if kind == RATE_LIMITED and retry_after is not None:
+                    time.sleep(retry_after + random.uniform(0, 1))
+                else:
+                    # 等值抖动：一半固定，一半随机，避免大量调用同时重试
+                    capped = min(delay, self.MAX_DELAY)
+                    time.sleep(capped / 2 + random.uniform(0, capped / 2))
+                    delay *= self.BACKOFF_FACTOR
+            else:
+                self.breaker.onSuccess()
+                self.budget.onSuccess()
+                return feedback
+            # 无论以何种方式结束，试探调用都不能一直占着试探名额
+            finally:
+                if is_probe: self.breaker.releaseProbe()
+
+
+
+def classifyError(e: Exception) -> tuple[str, float | None]:
+    '''
+    判断错误是否值得重试。
+
+    :return: `(错误类型, 服务器要求的等待秒数)`，错误类型为`RETRYABLE`、`RATE_LIMITED`或`FATAL`。
+    '''
+    status, retry_after = None, None
+    if isinstance(e, apihelper.ApiTelegramException):
+        status = e.error_code
+        retry_after = (e.result_json.get('parameters') or dict()).get('retry_after')
+    elif isinstance(e, apihelper.ApiHTTPException) and e.result is not None:
+        status = e.result.status_code
+        retry_after = parseRetryAfter(e.result.headers.get('Retry-After'))
+    elif isinstance(e, requests.HTTPError) and e.response is not None:
+        status = e.response.status_code
+        retry_after = parseRetryAfter(e.response.headers.get('Retry-After'))
+    elif isinstance(e, (CircuitOpen, TypeError, AttributeError, KeyError, NotImplementedError,
+        FileNotFoundError, IsADirectoryError, PermissionError)):
+        return FATAL, None
+    # 连接失败、超时、下载不完整及其他未知错误
+    else: return RETRYABLE, None
+
+    if status == 429: return RATE_LIMITED, retry_after
+    if status == 408 or status >= 500: return RETRYABLE, None
+    return FATAL, None
+
+
+def parseRetryAfter(value: str | None) -> float | None:
+    '''解析`Retry-After`，支持秒数和 HTTP 日期两种格式。'''
+    if not value: return None
+    try: return max(float(value), 0)
+    except ValueError: pass
+    try: return max((parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds(), 0)
+    except (TypeError, ValueError): return None
 
 
 def autoRetry(
@@ -24,25 +218,44 @@ def autoRetry(
     max_tries: int = 5,
     base_delay: float | int = 1,
     backoff_factor: float = 2.0,
+    endpoint: str = None,
 ):
-    '''自动重试装饰器，支持指数退避。'''
-    def decorator(*args, **kwargs):
-        err = Exception()
-        delay = base_delay
-        for attempt in range(max_tries):
-            try:
-                feedback = func(*args, **kwargs)
-                return feedback
-            except Exception as e:
-                err = e
-                if attempt < max_tries - 1:
-                    time.sleep(delay)
-                    delay *= backoff_factor
-        raise err
+    '''
+    自动重试装饰器，按错误类型决定是否重试，见`RetryPolicy`。
+
+    :param endpoint: 共用重试预算和熔断器的接口名，默认 TeleBot 的方法为`telegram`，其他为`default`。
+    '''
+    if endpoint is None:
+        endpoint = 'telegram' if isinstance(getattr(func, '__self__', None), telebot.TeleBot) else 'default'
+    policy = RetryPolicy(endpoint, max_tries, base_delay, backoff_factor)
+    def decorator(*args, **kwargs): return policy.call(func, *args, **kwargs)
     return decorator
 
 
 
+def sha256File(file_path: str, chunk_size: int = 1024 * 1024) -> str:
+    '''分块计算文件的 SHA-256，不会把整个文件读入内存。'''
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        while chunk := f.read(chunk_size): digest.update(chunk)
+    return digest.hexdigest()
+
+
+def loadJsonFile(file_path: str, default=None):
+    '''读取 JSON 文件，文件不存在时返回`default`。'''
+    if not os.path.exists(file_path): return default
+    with open(file_path, 'rt') as f: return json.load(f)
+
+
+def saveJsonFile(file_path: str, obj, **kwargs):
+    '''先写入临时文件再原子重命名，避免写入中断时损坏原文件。'''
+    temp_file_path = f'{file_path}.tmp'
+    with open(temp_file_path, 'w') as f:
+        json.dump(obj, f, ensure_ascii=False, **kwargs)
+    os.replace(temp_file_path, file_path)
+
+
+
 class P2TLogging:
     def __init__(
             self,
@@ -0,0 +1,41 @@
+'''
+大文件分卷：把文件按字节切成编号的分卷`<文件名>.001`、`<文件名>.002`……，逐个生成，不压缩（原图本身已是压缩格式）。
+合并：`cat 文件名.001 文件名.002 > 文件名`（Windows：`copy /b 文件名.001+文件名.002 文件名`），或用 7-Zip 打开`.001`。
+'''
+
+import hashlib
+
+
+
+def countVolumes(file_size: int, volume_size: int) -> int:
+    return max(-(-file_size // volume_size), 1)
+
+
+def volumeName(file_name: str, index: int) -> str:
+    ''':param index: 从 0 开始的分卷序号，文件名中从 001 开始。'''
+    return f'{file_name}.{index + 1:03d}'
+
+
+def writeVolume(
+        file_path: str,
+        volume_path: str,
+        index: int,
+        volume_size: int,
+        chunk_size: int = 8 * 1024 ** 2,
+    ) -> str:
+    '''
+    把文件的第`index`个分卷写入`volume_path`，边读边计算 SHA-256。
+
+    :return: 分卷内容的 SHA-256
+    '''
+    sha256 = hashlib.sha256()
+    remaining = volume_size
+    with open(file_path, 'rb') as src, open(volume_path, 'wb') as dst:
+        src.seek(index * volume_size)
+        while remaining > 0:
+            chunk = src.read(min(chunk_size, remaining))
+            if not chunk: break
+            dst.write(chunk)
+            sha256.update(chunk)
+            remaining -= len(chunk)
+    return sha256.hexdigest()
@@ -0,0 +1,80 @@
+'''
+图像处理进程池：渲染封面、编码动图等 CPU 密集的任务放到子进程中执行，不占用同步线程的 GIL，
+下载和上传可以同时进行。子进程执行一定数量的任务后退出重建，限制 Pillow 长期运行的内存增长。
+
+提交的函数和参数须能被 pickle（模块级函数，如`renderCover`、`encodeUgoira`）。
+'''
+
+import logging
+import threading
+import multiprocessing
+
+from typing import Callable
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+
+
+class ImagePool:
+    '''
+    `ProcessPoolExecutor`的封装：使用 spawn 方式启动子进程（不继承主进程的线程和锁），
+    子进程执行`max_tasks_per_child`个任务后重建；进程池损坏（例如子进程被 OOM 杀掉）时自动重建。
+
+    `max_workers`为 0 时不启动子进程，任务在调用线程中直接执行。
+    '''
+    def __init__(self, max_workers: int = 2, max_tasks_per_child: int = 20):
+        self.MAX_WORKERS = max_workers
+        self.MAX_TASKS_PER_CHILD = max_tasks_per_child
+        self.executor: ProcessPoolExecutor | None = None
+        self.lock = threading.Lock()
+
+        # 日志
+        self.logger = logging.getLogger('Pixar2Tele')
+
+
+    def getExecutor(self) -> ProcessPoolExecutor:
+        '''首次提交任务时才启动进程池。'''
+        with self.lock:
+            if self.executor is None:
+                self.executor = ProcessPoolExecutor(
+                    max_workers=self.MAX_WORKERS,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    max_tasks_per_child=self.MAX_TASKS_PER_CHILD,
+                )
+            return self.executor
+
+
+    def resetExecutor(self, broken: ProcessPoolExecutor):
+        with self.lock:
+            if self.executor is not broken: return
+            self.logger.warning("[进程池] 进程池已损坏，正在重建。")
+            self.executor = None
+        broken.shutdown(wait=False, cancel_futures=True)
+
+
+    def submit(self, func: Callable, *args, **kwargs) -> Future:
+        '''提交任务，返回`Future`。'''
+        if self.MAX_WORKERS <= 0:
+            future = Future()
+            try: future.set_result(func(*args, **kwargs))
+            except Exception as e: future.set_exception(e)
+            return future
+        executor = self.getExecutor()
+        try: return executor.submit(func, *args, **kwargs)
+        except BrokenProcessPool:
+            self.resetExecutor(executor)
+            return self.getExecutor().submit(func, *args, **kwargs)
+
+
+    def call(self, func: Callable, *args, **kwargs):
+        '''提交任务并等待结果；任务因进程池损坏而失败时，重建进程池再执行一次。'''
+        try: return self.submit(func, *args, **kwargs).result()
+        except BrokenProcessPool:
+            self.resetExecutor(self.executor)
+            return self.submit(func, *args, **kwargs).result()
+
+
+    def shutdown(self, wait: bool = True):
+        with self.lock:
+            executor, self.executor = self.executor, None
+        if executor is not None: executor.shutdown(wait=wait, cancel_futures=True)
@@ -0,0 +1,59 @@
+'''
+临时工作区：每个任务（渲染封面、大文件分卷）在临时目录下使用独立的子目录，结束后自动删除，
+并发任务不会互相覆盖文件。所有工作区合计占用的空间不超过预算，超出时排队等待。
+'''
+
+import os
+import shutil
+import logging
+import tempfile
+import threading
+
+from contextlib import contextmanager
+
+
+
+class TempSpace:
+    '''
+    工作区位于`<root>/jobs/<随机名>`。进入工作区前声明预计占用的字节数，预算不足时等待其他工作区释放；
+    单个任务的预计占用超过整个预算时，等到没有其他工作区时独占运行。
+    '''
+    def __init__(self, root: str, max_bytes: int = 10 * 1000 ** 3):
+        self.ROOT = os.path.join(root, 'jobs')
+        self.MAX_BYTES = max_bytes
+        self.reserved = 0
+        self.active = 0
+        self.condition = threading.Condition()
+
+        # 日志
+        self.logger = logging.getLogger('Pixar2Tele')
+
+        # 清理上次运行异常退出时留下的工作区
+        if os.path.exists(self.ROOT): shutil.rmtree(self.ROOT, ignore_errors=True)
+        os.makedirs(self.ROOT, exist_ok=True)
+
+
+    @contextmanager
+    def workspace(self, reserve_bytes: int = 0, prefix: str = 'job-'):
+        '''
+        用法：`with temp_space.workspace(预计字节数) as dir_path: ...`
+
+        :param reserve_bytes: 预计在工作区中写入的字节数，用于预算排队，不限制实际写入。
+        '''
+        with self.condition:
+            if reserve_bytes > self.MAX_BYTES:
+                self.logger.warning(f"[临时空间] 任务预计占用 {reserve_bytes / 1e6:.2f} MB，" +\
+                    f"超过预算 {self.MAX_BYTES / 1e6:.2f} MB，等待独占运行。")
+            self.condition.wait_for(lambda: self.active == 0 or
+                self.reserved + reserve_bytes <= self.MAX_BYTES)
+            self.reserved += reserve_bytes
+            self.active += 1
+        try:
+            dir_path = tempfile.mkdtemp(prefix=prefix, dir=self.ROOT)
+            try: yield dir_path
+            finally: shutil.rmtree(dir_path, ignore_errors=True)
+        finally:
+            with self.condition:
+                self.reserved -= reserve_bytes
+                self.active -= 1
+                self.condition.notify_all()
@@ -0,0 +1,88 @@
+# 比较各动图输出格式的编码耗时和文件大小
+#
+# Usage: python benchmarks/ugoira_encoding.py [<ugoira.zip> ...] [--delay 60] [--repeat 3]
+#
+# 不给出 zip 时会生成一段合成的示例动图。每个 zip 旁如有同名的 `.json`（ugoira_meta 的 body，
+# 或其中的 frames 列表），则使用其中的帧时长，否则所有帧都使用 --delay。
+
+import io
+import os
+import sys
+import json
+import time
+import zipfile
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image
+
+from Pixar2Tele.ugoira import UGOIRA_FORMATS, GifStreamWriter, iterUgoiraFrames, encodeUgoira
+
+
+
+def loadFrames(zip_path: str, delay: int) -> list[dict]:
+    meta_path = os.path.splitext(zip_path)[0] + '.json'
+    if os.path.exists(meta_path):
+        with open(meta_path, 'rt') as f: meta = json.load(f)
+        return meta['frames'] if isinstance(meta, dict) else meta
+    with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+        return [{'file': name, 'delay': delay} for name in sorted(zip_ref.namelist())]
+
+
+def makeSyntheticUgoira(zip_path: str, num_frames: int = 60, size=(1000, 750)):
+    with zipfile.ZipFile(zip_path, 'w') as zip_ref:
+        for idx in range(num_frames):
+            extent = (-2.2 + idx * 0.01, -1.2, 0.8 - idx * 0.01, 1.2)
+            image = Image.effect_mandelbrot(size, extent, 128).convert('RGB')
+            buffer = io.BytesIO()
+            image.save(buffer, format='JPEG', quality=90)
+            zip_ref.writestr(f'{idx:06d}.jpg', buffer.getvalue())
+
+
+def encodeGifLocalPalettes(zip_path: str, frames: list[dict], output_path: str):
+    '''旧的编码方式：每帧单独量化，作为对照组。'''
+    with GifStreamWriter(output_path) as writer:
+        for image, delay in iterUgoiraFrames(zip_path, frames):
+            writer.append(image, delay)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('zips', nargs='*')
+    parser.add_argument('--delay', type=int, default=60)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        zip_paths = args.zips
+        if not zip_paths:
+            zip_paths = [os.path.join(temp_dir, 'synthetic.zip')]
+            makeSyntheticUgoira(zip_paths[0])
+
+        encoders = {'gif (逐帧调色板)': (encodeGifLocalPalettes, '.gif')}
+        for output_format, file_ext in UGOIRA_FORMATS.items():
+            encoders[output_format] = (
+                lambda z, f, o, fmt=output_format: encodeUgoira(z, f, o, output_format=fmt), file_ext)
+
+        for zip_path in zip_paths:
+            frames = loadFrames(zip_path, args.delay)
+            zip_size = os.path.getsize(zip_path)
+            print(f"\n{os.path.basename(zip_path)}：{len(frames)} 帧，zip {zip_size / 1e6:.2f} MB")
+            print(f"{'格式':<18}{'耗时(s)':>10}{'大小(MB)':>12}{'相对 zip':>10}")
+            for name, (encode, file_ext) in encoders.items():
+                output_path = os.path.join(temp_dir, f'output{file_ext}')
+                elapsed = []
+                for _ in range(args.repeat):
+                    start = time.perf_counter()
+                    encode(zip_path, frames, output_path)
+                    elapsed.append(time.perf_counter() - start)
+                output_size = os.path.getsize(output_path)
+                print(f"{name:<18}{min(elapsed):>10.2f}{output_size / 1e6:>12.2f}" +\
+                    f"{output_size / zip_size:>10.2f}")
+                os.remove(output_path)
+
+
+if __name__ == '__main__':
+    main()
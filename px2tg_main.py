@@ -7,107 +7,123 @@ import tomlkit
 from telebot.types import Message
 from telebot import TeleBot
 
-from Pixar2Tele import Tasks, P2TLogging, autoRetry
-
-
-
-# 读取配置信息
-with open('config.toml', 'r+t') as f:
-    config: dict = tomlkit.load(f)
-    # 时区
-    timezone = config['timezone']
-    # 创建 Bot 对象
-    bot = TeleBot(config['telegram']['botToken'])
-    # 有权限使用机器人的用户
-    ALLOWED_TELEGRAM_USERS = config['telegram']['allowedUsers']
-    # 日志配置
-    p2t_logging = P2TLogging(
-        log_file_path = config['logFile'],
-        timezone = timezone,
-    )
-    # 设置任务，并初始化
-    tasks = Tasks(
-        bot = bot,
-        custom_api_server_url = config['telegram']['customApiServerURL'],
-        allowed_telegram_users = config['telegram']['allowedUsers'],
-        pixiv_user_id = config['pixiv']['userID'],
-        channel_id = config['telegram']['archiveChatIDs']['channel'],
-        group_id = config['telegram']['archiveChatIDs']['group'],
-        dustbin_id = config['telegram']['archiveChatIDs']['dustbin'],
-        metadata_file_path = config['paths']['metadataFile'],
-        records_file_path = config['paths']['recordsFile'],
-        err404_cover_file_path = config['paths']['err404Picture'],
-        save_path = config['paths']['artworkSave'],
-        temp_path = './temp',
-        headers = config['pixiv']['headers'],
-        proxies = None,
-        timezone = timezone,
-    )
-
-
-logger = p2t_logging.getLogger()
-
-p2t_logging.filterKeywords(exclude_keywords=[
-    'TimeoutError',
-    'urllib3.exceptions.ReadTimeoutError',
-    'requests.exceptions.ReadTimeout',
-    'requests.exceptions.ConnectionError',
-    'telebot.apihelper.ApiTelegramException',
-])
-
-
-@bot.message_handler(commands=['start'], 
-    func=lambda msg: int(msg.from_user.id) in ALLOWED_TELEGRAM_USERS)
-def showHelpInfo(message:Message):
-    logger.info("[用法提示] 请求来自：tg://user?id=%d", message.chat.id)
-    autoRetry(bot.send_message)(message.chat.id, parse_mode='HTML',
-        text="<code>/start</code>\n<blockquote>开启对话，查看命令用法。</blockquote>\n" +\
-            "<code>/sync</code>\n<blockquote>命令式（触发式）同步 Pixiv 收藏夹。</blockquote>" +\
-            "<code>/input</code>\n<blockquote>手动输入作品。</blockquote>" +\
-            "<code>/modify</code>\n<blockquote>手动修改作品。</blockquote>" +\
-            "<code>/cancel</code>\n<blockquote>取消所有当前任务。</blockquote>",
-    )
-
-
-@bot.message_handler(commands=['sync'], 
-    func=lambda msg: int(msg.from_user.id) in ALLOWED_TELEGRAM_USERS)
-def syncByTriggered(message: Message):
-    '''触发式/命令式同步Pixiv收藏夹，无参数。'''
-    logger.info("[触发式同步] 请求来自：tg://user?id=%d", message.chat.id)
-    tasks.startTriggeredSync(feedback_chat_ids=[message.chat.id])
-
-
-@bot.message_handler(commands=['input'], 
-    func=lambda msg: int(msg.from_user.id) in ALLOWED_TELEGRAM_USERS)
-def manuallyInputArtwork(message: Message):
-    logger.info("[手动输入作品] 请求来自：tg://user?id=%d", message.chat.id)
-    tasks.manuallyInputArtwork(message)
-
-
-@bot.message_handler(commands=['modify'], 
-    func=lambda msg: int(msg.from_user.id) in ALLOWED_TELEGRAM_USERS)
-def manuallyModifyArtwork(message: Message):
-    logger.info("[手动修改作品] 请求来自：tg://user?id=%d", message.chat.id)
-    tasks.manuallyModifyArtwork(message)
-
-
-@bot.message_handler(commands=['cancel'], 
-    func=lambda msg: int(msg.from_user.id) in ALLOWED_TELEGRAM_USERS)
-def cancelAllTasks(message: Message):
-    logger.info("[取消当前所有任务] 请求来自：tg://user?id=%d", message.chat.id)
-    tasks.stopAllTasks()
-    tasks.startScheduledTasks()
-    autoRetry(bot.send_message)(message.chat.id, "✅ 已取消当前所有任务。")
-
-
-@bot.message_handler(commands=['start', 'sync', 'input', 'modify', 'cancel'], 
-    func=lambda msg: int(msg.from_user.id) not in ALLOWED_TELEGRAM_USERS)
-def handleRestrictedMessage(message:Message):
-    bot.send_message(message.chat.id, "你没有权限使用这个机器人。")
-    logger.warning("[禁止访客] 已禁止无权限访问者: tg://user?id=%d", message.chat.id)
-
-
-logger.info("启动 Bot: Pixiv Hearts to Telegram")
-bot.infinity_polling()
-
-
+from Pixar2Tele import Tasks, P2TLogging, autoRetry, ScheduledBot, TelegramScheduler
+
+
+
+# 图像处理进程池以 spawn 方式启动子进程，子进程会重新导入本模块，Bot 只能在主进程中启动
+if __name__ == '__main__':
+    # 读取配置信息
+    with open('config.toml', 'r+t') as f:
+        config: dict = tomlkit.load(f)
+        # 时区
+        timezone = config['timezone']
+        # 创建 Bot 对象，所有发送经过调度器限速
+        bot = ScheduledBot(TeleBot(config['telegram']['botToken']), TelegramScheduler(
+            global_per_second = config['telegram'].get('messagesPerSecond', 30),
+            group_per_minute = config['telegram'].get('groupMessagesPerMinute', 20),
+        ))
+        # 有权限使用机器人的用户
+        ALLOWED_TELEGRAM_USERS = config['telegram']['allowedUsers']
+        # 日志配置
+        p2t_logging = P2TLogging(
+            log_file_path = config['logFile'],
+            timezone = timezone,
+        )
+        # 设置任务，并初始化
+        tasks = Tasks(
+            bot = bot,
+            custom_api_server_url = config['telegram']['customApiServerURL'],
+            telegram_local_mode = config['telegram'].get('localMode', False),
+            allowed_telegram_users = config['telegram']['allowedUsers'],
+            pixiv_user_id = config['pixiv']['userID'],
+            channel_id = config['telegram']['archiveChatIDs']['channel'],
+            group_id = config['telegram']['archiveChatIDs']['group'],
+            dustbin_id = config['telegram']['archiveChatIDs']['dustbin'],
+            metadata_file_path = config['paths']['metadataFile'],
+            records_file_path = config['paths']['recordsFile'],
+            err404_cover_file_path = config['paths']['err404Picture'],
+            save_path = config['paths']['artworkSave'],
+            temp_path = './temp',
+            temp_space_limit = int(config['paths'].get('tempSpaceLimitMB', 10000) * 1000 ** 2),
+            image_workers = config.get('imageWorkers', 2),
+            image_tasks_per_worker = config.get('imageTasksPerWorker', 20),
+            headers = config['pixiv']['headers'],
+            proxies = None,
+            timezone = timezone,
+            pool_size = config['pixiv'].get('poolSize', 10),
+            max_concurrent_requests = config['pixiv'].get('maxConcurrentRequests', 4),
+            download_workers = config['pixiv'].get('downloadWorkers', 4),
+            ugoira_format = config['pixiv'].get('ugoiraFormat', 'gif'),
+            existence_workers = config['pixiv'].get('existenceWorkers', 4),
+            existence_checks_per_run = config['pixiv'].get('existenceChecksPerRun', 500),
+            max_request_rate = config['pixiv'].get('maxRequestRate', 20),
+        )
+
+
+    logger = p2t_logging.getLogger()
+
+    p2t_logging.filterKeywords(exclude_keywords=[
+        'TimeoutError',
+        'urllib3.exceptions.ReadTimeoutError',
+        'requests.exceptions.ReadTimeout',
+        'requests.exceptions.ConnectionError',
+        'telebot.apihelper.ApiTelegramException',
+    ])
+
+
+    @bot.message_handler(commands=['start'], 
+        func=lambda msg: int(msg.from_user.id) in ALLOWED_TELEGRAM_USERS)
+    def showHelpInfo(message:Message):
+        logger.info("[用法提示] 请求来自：tg://user?id=%d", message.chat.id)
+        autoRetry(bot.send_message)(message.chat.id, parse_mode='HTML',
+            text="<code>/start</code>\n<blockquote>开启对话，查看命令用法。</blockquote>\n" +\
+                "<code>/sync</code>\n<blockquote>命令式（触发式）增量同步 Pixiv 收藏夹，" +\
+                "<code>/sync full</code> 完整同步。</blockquote>" +\
+                "<code>/input</code>\n<blockquote>手动输入作品。</blockquote>" +\
+                "<code>/modify</code>\n<blockquote>手动修改作品。</blockquote>" +\
+                "<code>/cancel</code>\n<blockquote>取消所有当前任务。</blockquote>",
+        )
+
+
+    @bot.message_handler(commands=['sync'], 
+        func=lambda msg: int(msg.from_user.id) in ALLOWED_TELEGRAM_USERS)
+    def syncByTriggered(message: Message):
+        '''触发式/命令式同步Pixiv收藏夹，参数`full`表示完整同步，否则为增量同步。'''
+        logger.info("[触发式同步] 请求来自：tg://user?id=%d", message.chat.id)
+        full = 'full' in message.text.split()[1:]
+        tasks.startTriggeredSync(feedback_chat_ids=[message.chat.id], full=full)
+
+
+    @bot.message_handler(commands=['input'], 
+        func=lambda msg: int(msg.from_user.id) in ALLOWED_TELEGRAM_USERS)
+    def manuallyInputArtwork(message: Message):
+        logger.info("[手动输入作品] 请求来自：tg://user?id=%d", message.chat.id)
+        tasks.manuallyInputArtwork(message)
+
+
+    @bot.message_handler(commands=['modify'], 
+        func=lambda msg: int(msg.from_user.id) in ALLOWED_TELEGRAM_USERS)
+    def manuallyModifyArtwork(message: Message):
+        logger.info("[手动修改作品] 请求来自：tg://user?id=%d", message.chat.id)
+        tasks.manuallyModifyArtwork(message)
+
+
+    @bot.message_handler(commands=['cancel'], 
+        func=lambda msg: int(msg.from_user.id) in ALLOWED_TELEGRAM_USERS)
+    def cancelAllTasks(message: Message):
+        logger.info("[取消当前所有任务] 请求来自：tg://user?id=%d", message.chat.id)
+        tasks.stopAllTasks()
+        tasks.startScheduledTasks()
+        autoRetry(bot.send_message)(message.chat.id, "✅ 已取消当前所有任务。")
+
+
+    @bot.message_handler(commands=['start', 'sync', 'input', 'modify', 'cancel'], 
+        func=lambda msg: int(msg.from_user.id) not in ALLOWED_TELEGRAM_USERS)
+    def handleRestrictedMessage(message:Message):
+        bot.send_message(message.chat.id, "你没有权限使用这个机器人。")
+        logger.warning("[禁止访客] 已禁止无权限访问者: tg://user?id=%d", message.chat.id)
+
+
+    logger.info("启动 Bot: Pixiv Hearts to Telegram")
+    bot.infinity_polling()
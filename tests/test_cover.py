@@ -0,0 +1,43 @@
+import os
+
+import pytest
+from PIL import Image
+
+from Pixar2Tele.cover import renderCover
+
+
+MAX_DIM = 1280
+MAX_FILE_SIZE = 200 * 1024
+
+
+def paletteImage(size: tuple[int, int]) -> Image.Image:
+    image = Image.new('RGB', size)
+    for x in range(0, size[0], 250): image.paste((x % 256, 128, 255 - x % 256), (x, 0, x + 125, size[1]))
+    return image.convert('P', palette=Image.ADAPTIVE)
+
+
+@pytest.mark.parametrize('mode', ['P', '1', 'I;16', 'RGB', 'RGBA'])
+def test_render_large_image(tmp_path, mode):
+    if mode == 'P': image = paletteImage((5000, 3000))
+    elif mode == 'I;16': image = Image.new('I;16', (5000, 3000), 40000)
+    else: image = Image.new(mode, (5000, 3000))
+    input_path = str(tmp_path / 'input.png')
+    image.save(input_path)
+
+    output_path = renderCover(input_path, str(tmp_path / 'cover.jpg'), MAX_DIM, MAX_FILE_SIZE)
+    assert os.path.getsize(output_path) <= MAX_FILE_SIZE
+    with Image.open(output_path) as cover:
+        assert cover.format == 'JPEG' and cover.mode == 'RGB'
+        assert max(cover.size) <= MAX_DIM
+        # 16 位灰度按比例缩放为 8 位，不会被截断成白色
+        if mode == 'I;16': assert cover.getpixel((0, 0))[0] == pytest.approx(40000 // 256, abs=2)
+
+
+def test_render_transparent_palette_on_white(tmp_path):
+    image = Image.new('P', (3000, 3000))
+    image.info['transparency'] = 0
+    input_path = str(tmp_path / 'input.png')
+    image.save(input_path, transparency=0)
+
+    output_path = renderCover(input_path, str(tmp_path / 'cover.jpg'), MAX_DIM, MAX_FILE_SIZE)
+    with Image.open(output_path) as cover: assert cover.getpixel((0, 0)) == pytest.approx((255, 255, 255), abs=2)
@@ -0,0 +1,93 @@
+import json
+
+import pandas as pd
+
+from Pixar2Tele import metastore
+from Pixar2Tele.metastore import MetaStore, RECORDS_COLUMNS, readJsonCsv
+
+
+def recordsFrame(rows: list[tuple]) -> pd.DataFrame:
+    records_df = pd.DataFrame(rows, columns=RECORDS_COLUMNS)
+    records_df.index = records_df['id']
+    return records_df
+
+
+def writeJsonCsv(tmp_path, meta_dict: dict, records_df: pd.DataFrame) -> tuple[str, str]:
+    metadata_file_path, records_file_path = str(tmp_path / 'metadata.json'), str(tmp_path / 'records.csv')
+    with open(metadata_file_path, 'w') as f: json.dump(meta_dict, f, ensure_ascii=False)
+    records_df.to_csv(records_file_path, index=False)
+    return metadata_file_path, records_file_path
+
+
+def test_migrate_load_export_roundtrip(tmp_path):
+    meta_dict = {'10': {"id": '10', "title": '标题'}, '2': {"id": '2', "tags": ['a', 'b']}}
+    records_df = recordsFrame([(1, '10', True, True), (2, '2', False, False)])
+    paths = writeJsonCsv(tmp_path, meta_dict, records_df)
+
+    store = MetaStore(str(tmp_path / 'metadata.sqlite3'))
+    assert store.migrate(*paths)
+    # 数据库不为空时不再迁移
+    assert not store.migrate(*paths)
+
+    loaded_meta, loaded_records = store.load()
+    assert loaded_meta == meta_dict
+    assert list(loaded_records['id']) == ['10', '2']
+    assert list(loaded_records['syncNo']) == [1, 2]
+    assert list(loaded_records['existence']) == [True, False]
+
+    export_paths = (str(tmp_path / 'export.json'), str(tmp_path / 'export.csv'))
+    store.export(*export_paths)
+    exported_meta, exported_records = readJsonCsv(*export_paths)
+    assert exported_meta == meta_dict
+    assert exported_records.equals(loaded_records)
+
+
+def test_migrate_old_records_without_bookmarked(tmp_path):
+    records_df = recordsFrame([(1, '1', True, True)]).drop(columns='bookmarked')
+    paths = writeJsonCsv(tmp_path, {'1': {"id": '1'}}, records_df)
+
+    store = MetaStore()
+    assert store.migrate(*paths)
+    assert list(store.load()[1]['bookmarked']) == [True]
+
+
+def test_save_writes_only_changed_artworks(monkeypatch):
+    now = iter(range(1, 100))
+    monkeypatch.setattr(metastore.time, 'time', lambda: next(now))
+    store = MetaStore()
+    meta_dict = {'1': {"id": '1', "title": 'a'}, '2': {"id": '2', "title": 'b'}}
+    records_df = recordsFrame([(1, '1', True, True), (2, '2', True, True)])
+    store.save(meta_dict, records_df)
+
+    meta_dict['2']['title'] = 'c'
+    records_df.at['1', 'bookmarked'] = False
+    store.save(meta_dict, records_df)
+    updated_at = dict(store.conn.execute('SELECT id, updated_at FROM artworks').fetchall())
+    assert updated_at == {'1': 1, '2': 2}
+
+    loaded_meta, loaded_records = store.load()
+    assert loaded_meta['2']['title'] == 'c'
+    assert list(loaded_records['bookmarked']) == [False, True]
+
+
+def test_save_does_not_delete_missing_artworks():
+    store = MetaStore()
+    store.save({'1': {"id": '1'}}, recordsFrame([(1, '1', True, True)]))
+    # 同时运行的任务持有的字典中没有另一个任务新增的作品
+    store.save({'2': {"id": '2'}}, recordsFrame([(2, '2', True, True)]))
+    meta_dict, records_df = store.load()
+    assert sorted(meta_dict) == ['1', '2']
+    assert list(records_df['id']) == ['1', '2']
+
+
+def test_save_artwork_partial():
+    store = MetaStore()
+    store.saveArtwork('1', {"id": '1', "syncStage": 'downloaded'}, None)
+    meta_dict, records_df = store.load()
+    assert meta_dict == {'1': {"id": '1', "syncStage": 'downloaded'}}
+    assert records_df.empty
+
+    store.saveArtwork('1', None, (1, '1', True, True))
+    meta_dict, records_df = store.load()
+    assert meta_dict['1']["syncStage"] == 'downloaded'
+    assert list(records_df['id']) == ['1']
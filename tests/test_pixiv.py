@@ -0,0 +1,85 @@
+import os
+import hashlib
+from types import SimpleNamespace
+
+import pytest
+
+from Pixar2Tele.pixiv import PixivTools
+
+
+def originalUrl(name: str) -> str:
+    return f'https://i.pximg.net/img-original/img/2024/01/01/00/00/00/{name}.png'
+
+
+@pytest.fixture
+def pixiv(tmp_path):
+    pixiv = PixivTools(0, str(tmp_path), headers={}, proxies=None, download_workers=1)
+    pixiv.requests = []
+    pixiv.contents = dict()
+
+    def downloadFile(url, file_path, headers=None, timeout=30, validators=None):
+        pixiv.requests.append((url, validators))
+        if validators: return {"sha256": None, "etag": validators["etag"],
+            "lastModified": validators["lastModified"], "notModified": True}
+        content = pixiv.contents[url]
+        with open(file_path, 'wb') as f: f.write(content)
+        return {"sha256": hashlib.sha256(content).hexdigest(), "etag": f'"{url}"',
+            "lastModified": None, "notModified": False}
+
+    pixiv.downloadFile = downloadFile
+    return pixiv
+
+
+def setPages(pixiv: PixivTools, names: list[str]):
+    body = [{"urls": {"original": originalUrl(name)}} for name in names]
+    pixiv.get = lambda *args, **kwargs: SimpleNamespace(json=lambda: {"body": body})
+
+
+def download(pixiv: PixivTools, version: int, previous: tuple = (None, None)) -> tuple[list[str], list[dict]]:
+    return pixiv.downloadPictures(1, version, download_headers={},
+        previous_pages=previous[0], previous_digests=previous[1])
+
+
+def test_validators_only_for_same_url(pixiv):
+    for name in ('1_p0', '1_p1', '1_p1_new'): pixiv.contents[originalUrl(name)] = name.encode()
+    setPages(pixiv, ['1_p0', '1_p1'])
+    previous = download(pixiv, 1)
+    assert previous[0] == ['1_p0_v1.png', '1_p1_v1.png']
+
+    # 第 1 页前插入一页：按页码对应的上一版本地址不同，不能发送条件请求
+    pixiv.requests.clear()
+    setPages(pixiv, ['1_p0', '1_p1_new', '1_p1'])
+    pages, digests = download(pixiv, 2, previous)
+    validators = {url: validators for url, validators in pixiv.requests}
+    assert validators[originalUrl('1_p0')] is not None
+    assert validators[originalUrl('1_p1_new')] is None
+    assert validators[originalUrl('1_p1')] is None
+    assert pages == ['1_p0_v1.png', '1_p1_new_v2.png', '1_p1_v2.png']
+    assert [digest["url"] for digest in digests] == [originalUrl(name) for name in ('1_p0', '1_p1_new', '1_p1')]
+
+
+def test_no_validators_for_cleaned_up_page(pixiv):
+    pixiv.contents[originalUrl('1_p0')] = b'p0'
+    setPages(pixiv, ['1_p0'])
+    previous = download(pixiv, 1)
+    os.remove(os.path.join(pixiv.SAVE_PATH, previous[0][0]))
+
+    pixiv.requests.clear()
+    pages, _ = download(pixiv, 2, previous)
+    assert pixiv.requests == [(originalUrl('1_p0'), None)]
+    # 内容相同，继续使用上一版本的文件名
+    assert pages == previous[0]
+    assert os.path.exists(os.path.join(pixiv.SAVE_PATH, pages[0]))
+
+
+def test_unchanged_content_keeps_previous_name(pixiv):
+    pixiv.contents[originalUrl('1_p0')] = b'p0'
+    setPages(pixiv, ['1_p0'])
+    previous = download(pixiv, 1)
+    # 没有地址的旧摘要：完整下载后按 SHA-256 判断
+    previous[1][0].pop("url")
+
+    pages, digests = download(pixiv, 2, previous)
+    assert pages == previous[0]
+    assert digests[0]["sha256"] == previous[1][0]["sha256"]
+    assert not os.path.exists(os.path.join(pixiv.SAVE_PATH, '1_p0_v2.png'))
@@ -0,0 +1,27 @@
+import os
+import json
+
+from Pixar2Tele.store import ArtworkStore
+
+
+def writeFile(path: str, content: bytes):
+    with open(path, 'wb') as f: f.write(content)
+
+
+def test_manifest_written_once_per_save(tmp_path):
+    store = ArtworkStore(str(tmp_path))
+    for idx in range(3):
+        writeFile(tmp_path / f'1_p{idx}_v0.png', b'same')
+        store.add(f'1_p{idx}_v0.png')
+    # 加入存储只修改内存中的清单
+    assert not os.path.exists(store.MANIFEST_FILE_PATH)
+
+    store.save()
+    with open(store.MANIFEST_FILE_PATH) as f: manifest = json.load(f)
+    assert len(manifest["files"]) == 3
+    assert list(manifest["refs"].values()) == [3]
+
+    # 没有修改时不重写清单
+    mtime = os.path.getmtime(store.MANIFEST_FILE_PATH)
+    store.save()
+    assert os.path.getmtime(store.MANIFEST_FILE_PATH) == mtime
@@ -0,0 +1,72 @@
+import logging
+from types import SimpleNamespace
+
+import pandas as pd
+
+from Pixar2Tele.syncher import Syncher
+from Pixar2Tele.metastore import MetaStore
+
+
+def test_reupload_sends_only_changed_pages(tmp_path):
+    sent = []
+    syncher = Syncher.__new__(Syncher)
+    syncher.SAVE_PATH = str(tmp_path)
+    syncher.CHANNEL_ID, syncher.GROUP_ID = -100, -200
+    syncher.genCaption = lambda syncno, **artwork_info: ''
+    syncher.Teleg = SimpleNamespace(
+        updatePhoto=lambda **kwargs: sent.append(('cover', kwargs['photo_path'])),
+        sendFile=lambda file_path, **kwargs: sent.append(('file', file_path)) or [99],
+    )
+    artwork_info = {
+        "pages": ['1_p0_v1.png', '1_p1_v1.png', '1_p2_v2.png'],
+        "pageDigests": [{"sha256": 'a'}, {"sha256": 'b'}, {"sha256": 'c'}],
+        "pageDocumentMessageIds": [[1], [2]],
+        "channelMessageId": 10, "groupMessageId": 20,
+    }
+
+    msg_ids = syncher.updateArtworkMSG(1, artwork_info, need_reupload=True, changed_pages=[2])
+    # 第 0 页没有变化，只修改封面描述；只发送新增的第 2 页
+    assert sent == [('cover', None), ('file', str(tmp_path / '1_p2_v2.png'))]
+    assert artwork_info["pageDocumentMessageIds"] == [[1], [2], [99]]
+    assert msg_ids == [1, 2, 99]
+
+
+def recordsFrame(rows: list[tuple]) -> pd.DataFrame:
+    records_df = pd.DataFrame(rows, columns=['syncNo', 'id', 'existence', 'bookmarked'])
+    records_df.index = records_df['id']
+    return records_df
+
+
+def test_bookmark_diff_skips_manual_input():
+    updated = []
+    syncher = Syncher.__new__(Syncher)
+    syncher.Pixiv = SimpleNamespace(listCollectionIds=lambda **kwargs: {'1'})
+    syncher.updateArtworkMSG = lambda syncno, artwork_info, **kwargs: updated.append(artwork_info['id'])
+    meta_dict = {
+        '1': {"id": '1'},
+        '2': {"id": '2', "manuallyInput": True},
+        '3': {"id": '3'},
+    }
+    records_df = recordsFrame([(1, '1', True, True), (2, '2', True, True), (3, '3', True, True)])
+
+    meta_dict, records_df, _ = syncher.updateBookmarkStates('', [], meta_dict, records_df)
+    assert updated == ['3']
+    assert list(records_df['bookmarked']) == [True, True, False]
+
+    # 没有同步记录时也能比对
+    _, records_df, _ = syncher.updateBookmarkStates('', [], dict(), recordsFrame([]))
+    assert records_df.empty
+
+
+def test_orphan_checkpoints_removed_on_load():
+    syncher = Syncher.__new__(Syncher)
+    syncher.logger = logging.getLogger('Pixar2Tele')
+    syncher.Meta = MetaStore()
+    # 旧版本在上传前写入的新作品检查点，之后上传失败
+    syncher.Meta.saveArtwork('1', {"id": '1', "syncStage": 'downloaded'}, None)
+    # 已同步过的作品下载了新版本，尚未更新消息
+    syncher.Meta.saveArtwork('2', {"id": '2', "syncStage": 'downloaded'}, (1, '2', True, True))
+
+    meta_dict, records_df = syncher.getMetaAndRecords()
+    assert list(meta_dict) == ['2']
+    assert list(syncher.Meta.load()[0]) == ['2']
@@ -0,0 +1,41 @@
+from types import SimpleNamespace
+
+import pytest
+from telebot import TeleBot, apihelper
+
+from Pixar2Tele.telegram import TelegramTools
+
+
+@pytest.fixture
+def teleg(tmp_path):
+    api_url, file_url = apihelper.API_URL, apihelper.FILE_URL
+    teleg = TelegramTools(TeleBot('1:token'), dustbin_id=0, temp_path=str(tmp_path / 'temp'),
+        custom_api_server_url='http://caddy:80/', local_mode=False,
+        local_roots=[str(tmp_path / 'artworks'), str(tmp_path / 'temp')])
+    yield teleg
+    apihelper.API_URL, apihelper.FILE_URL = api_url, file_url
+
+
+def test_local_upload_only_under_mounted_roots(teleg, tmp_path):
+    teleg.LOCAL_MODE = True
+    sent = []
+    for file_path in (tmp_path / 'artworks' / '1_p0_v1.png', tmp_path / 'pixiv404.png'):
+        file_path.parent.mkdir(exist_ok=True)
+        file_path.write_bytes(b'png')
+        teleg.sendByFileId('photo', file_path.name, sent.append, lambda: str(file_path))
+    assert sent[0] == f'file://{tmp_path / "artworks" / "1_p0_v1.png"}'
+    # 不在挂载目录中的文件通过 HTTP 上传
+    assert not isinstance(sent[1], str)
+
+
+def test_download_strips_local_server_path(teleg, tmp_path):
+    # 服务器以 --local 模式运行，但配置中没有开启本地模式
+    requested = []
+    teleg.bot.get_file = lambda file_id: SimpleNamespace(
+        file_path='/var/lib/telegram-bot-api/1:token/documents/file_0.png')
+    teleg.bot.download_file = lambda remote_path: requested.append(remote_path) or b'png'
+    message = SimpleNamespace(document=SimpleNamespace(file_id='id', file_name='input.png'))
+
+    file_name = teleg.downloadFile(message, str(tmp_path), '1_p0_v1')
+    assert requested == ['documents/file_0.png']
+    assert (tmp_path / file_name).read_bytes() == b'png'
@@ -0,0 +1,48 @@
+import io
+import zipfile
+
+import pytest
+from PIL import Image
+
+from Pixar2Tele.ugoira import encodeUgoira
+
+
+COLORS = [(255, 0, 0), (0, 255, 0), (0, 0, 255)]
+DELAYS = [100, 50, 200]
+
+
+@pytest.fixture
+def ugoira_zip(tmp_path):
+    zip_path = str(tmp_path / 'ugoira.zip')
+    frames = []
+    with zipfile.ZipFile(zip_path, 'w') as zip_ref:
+        for idx, (color, delay) in enumerate(zip(COLORS, DELAYS)):
+            buffer = io.BytesIO()
+            Image.new('RGB', (61, 41), color).save(buffer, format='JPEG', quality=95)
+            zip_ref.writestr(f'{idx:06d}.jpg', buffer.getvalue())
+            frames.append({"file": f'{idx:06d}.jpg', "delay": delay})
+    return zip_path, frames
+
+
+@pytest.mark.parametrize('output_format, ext', [('gif', '.gif'), ('webp', '.webp'), ('apng', '.png')])
+def test_encode_frames_and_durations(tmp_path, ugoira_zip, output_format, ext):
+    output_path = str(tmp_path / f'output{ext}')
+    encodeUgoira(*ugoira_zip, output_path, output_format=output_format)
+
+    with Image.open(output_path) as image:
+        assert image.size == (61, 41)
+        assert image.n_frames == len(COLORS)
+        for idx, (color, delay) in enumerate(zip(COLORS, DELAYS)):
+            image.seek(idx)
+            frame = image.convert('RGB')
+            assert image.info['duration'] == delay
+            assert frame.getpixel((30, 20)) == pytest.approx(color, abs=24)
+
+
+def test_encode_mp4(tmp_path, ugoira_zip):
+    pytest.importorskip('imageio_ffmpeg')
+    from Pixar2Tele.ugoira import readVideoFirstFrame
+
+    output_path = str(tmp_path / 'output.mp4')
+    encodeUgoira(*ugoira_zip, output_path, output_format='mp4')
+    assert readVideoFirstFrame(output_path).getpixel((30, 20)) == pytest.approx(COLORS[0], abs=32)
@@ -0,0 +1,49 @@
+import time
+
+import pytest
+import requests
+
+from Pixar2Tele.utils import RetryPolicy, CircuitOpen
+
+
+def httpError(status_code: int) -> requests.HTTPError:
+    response = requests.Response()
+    response.status_code = status_code
+    return requests.HTTPError(response=response)
+
+
+def test_fatal_probe_closes_breaker():
+    policy = RetryPolicy(endpoint='test_fatal_probe', max_tries=1, base_delay=0)
+    breaker = policy.breaker
+    breaker.COOLDOWN = 0.05
+
+    def unavailable(): raise httpError(503)
+    def notFound(): raise httpError(404)
+
+    # 连续可重试的错误使熔断器断开
+    for _ in range(breaker.FAILURE_THRESHOLD):
+        with pytest.raises(requests.HTTPError): policy.call(unavailable)
+    with pytest.raises(CircuitOpen): policy.call(lambda: 'ok')
+
+    # 冷却结束后的试探调用得到 404：接口可用，熔断器恢复
+    time.sleep(0.1)
+    with pytest.raises(requests.HTTPError): policy.call(notFound)
+    assert not breaker.probing
+    assert policy.call(lambda: 'ok') == 'ok'
+
+
+def test_local_error_probe_releases_probe():
+    policy = RetryPolicy(endpoint='test_local_probe', max_tries=1, base_delay=0)
+    breaker = policy.breaker
+    breaker.COOLDOWN = 0.05
+
+    def unavailable(): raise httpError(503)
+    def badArgument(): raise TypeError('bad argument')
+
+    for _ in range(breaker.FAILURE_THRESHOLD):
+        with pytest.raises(requests.HTTPError): policy.call(unavailable)
+
+    # 本地错误不能说明接口是否可用，但也不能一直占着试探名额
+    time.sleep(0.1)
+    with pytest.raises(TypeError): policy.call(badArgument)
+    assert policy.call(lambda: 'ok') == 'ok'
@@ -0,0 +1,36 @@
+import os
+import hashlib
+
+import pytest
+
+from Pixar2Tele.volumes import countVolumes, volumeName, writeVolume
+
+
+@pytest.mark.parametrize('file_size, volume_size, expected', [
+    (0, 10, 1), (1, 10, 1), (10, 10, 1), (11, 10, 2), (25, 10, 3),
+])
+def test_count_volumes(file_size, volume_size, expected):
+    assert countVolumes(file_size, volume_size) == expected
+
+
+def test_volume_name():
+    assert volumeName('1_p0_v1.png', 0) == '1_p0_v1.png.001'
+    assert volumeName('1_p0_v1.png', 11) == '1_p0_v1.png.012'
+
+
+def test_volumes_rejoin_to_original(tmp_path):
+    content = os.urandom(25 * 1024 + 7)
+    file_path = str(tmp_path / 'big.png')
+    with open(file_path, 'wb') as f: f.write(content)
+    volume_size = 10 * 1024
+
+    joined = b''
+    for index in range(countVolumes(len(content), volume_size)):
+        volume_path = str(tmp_path / volumeName('big.png', index))
+        # 分块小于分卷，验证跨块读取
+        sha256 = writeVolume(file_path, volume_path, index, volume_size, chunk_size=4096)
+        with open(volume_path, 'rb') as f: volume = f.read()
+        assert len(volume) <= volume_size
+        assert sha256 == hashlib.sha256(volume).hexdigest()
+        joined += volume
+    assert joined == content